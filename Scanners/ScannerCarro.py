@@ -1,9 +1,15 @@
 import pandas as pd
 import asyncio
+import os
 import sys
 import logging
 from playwright.async_api import async_playwright
 
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.contexto import criar_contexto, navegar, metricas_rede
+
 # Configura encoding e logging
 sys.stdout.reconfigure(encoding='utf-8')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -11,11 +17,11 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 async def coletar_marcas():
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
-        context = await browser.new_context()
+        context = await criar_contexto(browser)
         page = await context.new_page()
 
         logging.info("Acessando o site da FIPE...")
-        await page.goto('https://veiculos.fipe.org.br/', timeout=120000)
+        await navegar(page, timeout=120000)
 
         # Seleciona Motos
         await page.wait_for_selector('li:has-text("Carros e utilitários pequenos")', timeout=30000)
@@ -44,3 +50,4 @@ async def coletar_marcas():
 
 if __name__ == "__main__":
     asyncio.run(coletar_marcas())
+    metricas_rede.logar()
@@ -2,12 +2,18 @@ import asyncio
 import json
 import logging
 import random
+import os
 import sys
 from pathlib import Path
 
 import pandas as pd
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.contexto import criar_contexto, navegar, metricas_rede
+
 sys.stdout.reconfigure(encoding="utf-8")
 logging.basicConfig(
     level=logging.INFO,
@@ -89,11 +95,11 @@ async def scan_modelos_por_marca(caminho_excel_marcas="marcas_Carros.xlsx", said
 
     async with async_playwright() as p:
         browser = await p.chromium.launch()
-        context = await browser.new_context()
+        context = await criar_contexto(browser)
         page = await context.new_page()
 
         logging.info("Acessando o site da FIPE...")
-        await page.goto("https://veiculos.fipe.org.br/", timeout=120000)
+        await navegar(page, timeout=120000)
 
         # Seleciona a aba Motos
         await page.wait_for_selector('li:has-text("Carros e utilitários pequenos")', timeout=30000)
@@ -151,4 +157,5 @@ async def scan_modelos_por_marca(caminho_excel_marcas="marcas_Carros.xlsx", said
     logging.info(f"Catálogo (tabular) salvo em: {saida_excel}")
 
 if __name__ == "__main__":
-    asyncio.run(scan_modelos_por_marca())
\ No newline at end of file
+    asyncio.run(scan_modelos_por_marca())
+    metricas_rede.logar()
@@ -0,0 +1,125 @@
+import pandas as pd
+import os
+import asyncio
+import sys
+import logging
+import json
+
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.api import ClienteFipeApi, coletar_marca_api
+from nucleo_fipe.perfis import PERFIS
+from nucleo_fipe.saida import criar_saida, ler_registros, FORMATO_PADRAO
+from nucleo_fipe.dataset import gravar_dataset
+from nucleo_fipe.limitador import logar_limites, configurar_limite
+
+# Configura encoding e logging
+sys.stdout.reconfigure(encoding='utf-8')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Coleta via API: chama direto os endpoints que o site usa, sem abrir o navegador.
+# Gera o mesmo "dados" do Scraping_carros/motos/caminhoes, então os arquivos são compatíveis.
+# Os registros vão para os segmentos de PERFIS[tipo].pasta_registros_api (ver saida.py); o Excel sai no fim
+ARQUIVOS_FINAIS = {
+    "carro": "Fipe_api.xlsx",
+    "moto": "Fipe_api_motos.xlsx",
+    "caminhao": "Fipe_api_caminhao.xlsx",
+}
+
+# Excel temporário das execuções anteriores aos segmentos: só lido na exportação
+ARQUIVOS_TEMP = {
+    "carro": "Fipe_temp_api.xlsx",
+    "moto": "Fipe_temp_api_motos.xlsx",
+    "caminhao": "Fipe_temp_api_caminhao.xlsx",
+}
+
+def marcas_processadas_json(tipo):
+    return f"marcas_processadas_api_{tipo}.json"
+
+# {mês: [marcas]}: a mesma marca é coletada de novo em outro mês de referência.
+# O formato antigo (lista de marcas sem o mês) não diz a que mês se refere e é descartado
+def carregar_marcas_processadas(tipo):
+    try:
+        with open(marcas_processadas_json(tipo), "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except Exception as e:
+        logging.warning(f"Não foi possivel carregar as marcas processadas {e}")
+        return {}
+    if not isinstance(dados, dict):
+        logging.warning(f"[RETOMADA] {marcas_processadas_json(tipo)} sem o mês de referência, recomeçando a retomada")
+        return {}
+    return {mes: set(marcas) for mes, marcas in dados.items()}
+
+def salvar_marcas_processadas(tipo, marcas_processadas):
+    with open(marcas_processadas_json(tipo), "w", encoding="utf-8") as f:
+        json.dump({mes: sorted(marcas) for mes, marcas in marcas_processadas.items()}, f, ensure_ascii=False)
+
+# limite_api=(taxa por segundo, rajada) troca o orçamento padrão do balde "api" (ver limitador.py)
+async def run(tipo="carro", nome_mes=None, max_marcas=None, max_modelos=None, max_anos=None, concorrencia=8, formato_saida=FORMATO_PADRAO, limite_api=None):
+    if limite_api is not None:
+        configurar_limite("api", *limite_api)
+    marcas_processadas = carregar_marcas_processadas(tipo)
+    saida = criar_saida(PERFIS[tipo].pasta_registros_api, formato_saida, tipo=tipo)
+
+    try:
+        async with ClienteFipeApi(tipo=tipo, max_conexoes=concorrencia) as cliente:
+            tabelas = await cliente.tabelas_referencia()
+            if nome_mes is None:
+                tabela = tabelas[0]
+            else:
+                tabela = next((t for t in tabelas if t["Mes"] == nome_mes.strip()), None)
+                if tabela is None:
+                    logging.error(f"[ERRO] Mês '{nome_mes}' não encontrado na Tabela de Referência!")
+                    return
+            mes = tabela["Mes"].strip()
+            logging.info(f"▶ Mês de referência: {mes} (código {tabela['Codigo']})")
+            processadas_mes = marcas_processadas.setdefault(mes, set())
+
+            marcas = await cliente.marcas(tabela["Codigo"])
+            if max_marcas is not None:
+                marcas = marcas[:max_marcas]
+            logging.info(f"[INFO] {len(marcas)} marcas capturadas.")
+
+            for i, marca in enumerate(marcas, start=1):
+                nome_marca = marca["Label"].strip()
+                if nome_marca in processadas_mes:
+                    logging.info(f"[SKIP] Marca já processada em {mes}: {nome_marca}")
+                    continue
+
+                logging.info(f"[{i}/{len(marcas)}] Processando Marca: {nome_marca}")
+                try:
+                    registros, falhas = await coletar_marca_api(cliente, tabela["Codigo"], marca, max_modelos, max_anos, concorrencia)
+                    for dados in registros:
+                        saida.gravar(dados)
+                    # Registros em disco antes de a marca contar como processada
+                    saida.descarregar()
+                    if falhas:
+                        logging.warning(f"[INCOMPLETO] {nome_marca} ({mes}): {falhas} falha(s), fica pendente para a próxima execução")
+                        continue
+                    processadas_mes.add(nome_marca)
+                    salvar_marcas_processadas(tipo, marcas_processadas)
+                except Exception as e:
+                    logging.warning(f"[ERRO] Marca [{nome_marca}]: {e}")
+    finally:
+        saida.fechar()
+
+# Versão vigente de cada registro dos segmentos (e do Excel temporário antigo, só nas chaves que faltam)
+# no Excel final do tipo e nas partições do dataset
+def exportar_final(tipo="carro", dataset=True):
+    temp = ARQUIVOS_TEMP[tipo]
+    legado = [pd.read_excel(temp, dtype=str)] if os.path.exists(temp) else []
+    df = ler_registros(PERFIS[tipo].pasta_registros_api, tipo, legado=legado)
+    if df.empty:
+        logging.warning(f"[FINAL] Nenhum dado coletado para {tipo} via API.")
+        return
+    df.to_excel(ARQUIVOS_FINAIS[tipo], index=False)
+    logging.info(f"[FINAL] {len(df)} registros de {tipo} em {ARQUIVOS_FINAIS[tipo]}")
+    if dataset:
+        gravar_dataset(df, tipo, "api")
+
+if __name__ == "__main__":
+    tipo = sys.argv[1] if len(sys.argv) > 1 else "carro"
+    asyncio.run(run(tipo=tipo, max_marcas=None, max_modelos=None, max_anos=None))
+    logar_limites()
+    exportar_final(tipo)
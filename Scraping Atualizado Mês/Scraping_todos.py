@@ -0,0 +1,25 @@
+import os
+import sys
+import asyncio
+import logging
+
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe import motor
+
+# Configura encoding e logging
+sys.stdout.reconfigure(encoding='utf-8')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Carros, motos e caminhões juntos no mesmo pool de navegador, com um único limite de workers
+TIPOS = ("carro", "moto", "caminhao")
+
+# Reaproveita a árvore de marcas/modelos/anos do mês anterior e consulta os preços direto;
+# False refaz a descoberta completa pelo formulário
+MODO_DELTA = True
+
+if __name__ == "__main__":
+    asyncio.run(motor.run(tipos=TIPOS, max_marcas=None, max_modelos=None, max_anos=None, max_workers=6, delta=MODO_DELTA))
+    motor.logar_relatorios()
+    motor.exportar_final(TIPOS)
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+from pathlib import Path
+from playwright.async_api import async_playwright
+
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.resultado import extrair_tabela_resultado
+
+# Compara o loop antigo (um await por célula) com o extrator de um único evaluate,
+# usando a tabela salva em fixtures/resultado_carro.html
+sys.stdout.reconfigure(encoding='utf-8')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+FIXTURE = Path(__file__).parent / "fixtures" / "resultado_carro.html"
+TABELA_ID = "resultadoConsultacarroFiltros"
+REPETICOES = 50
+
+# Loop copiado do processar_marca original, só para comparação
+async def extrair_loop_antigo(page):
+    codigo_fipe_elements = await page.locator('td:has-text("Código Fipe") + td p').all_text_contents()
+    preco_medio_elements = await page.locator('td:has-text("Preço Médio") + td p').all_text_contents()
+
+    codigo_fipe = next((x.strip() for x in codigo_fipe_elements if x.strip() and not x.strip().startswith('{')), "")
+    preco_medio = next((x.strip().replace('R$', '').replace('.', '').replace(',', '.') for x in preco_medio_elements if x.strip() and not x.strip().startswith('{')), "")
+
+    mes_referencia_elements = await page.locator('td:has-text("Mês de referência") + td p').all_text_contents()
+    marca_elements = await page.locator('td:has-text("Marca") + td p').all_text_contents()
+    modelo_elements = await page.locator('td:has-text("Modelo") + td p').all_text_contents()
+    ano_modelo_elements = await page.locator('td:has-text("Ano Modelo") + td p').all_text_contents()
+
+    mes_referencia = next((x.strip() for x in mes_referencia_elements if x.strip() and not x.strip().startswith('{')), "")
+    marca = next((x.strip() for x in marca_elements if x.strip() and not x.strip().startswith('{')), "")
+    modelo = next((x.strip() for x in modelo_elements if x.strip() and not x.strip().startswith('{')), "")
+    ano_modelo = next((x.strip() for x in ano_modelo_elements if x.strip() and not x.strip().startswith('{')), "")
+
+    linhas = await page.query_selector_all(f'table#{TABELA_ID} tr')
+    dados_tabela = {}
+    ultima_label = None
+
+    for linha in linhas:
+        tds = await linha.query_selector_all('td')
+        if len(tds) == 2:
+            nome_element = await tds[0].query_selector('p, strong')
+            valor_element = await tds[1].query_selector('p, strong')
+            nome_coluna = (await nome_element.inner_text()).strip() if nome_element else (await tds[0].inner_text()).strip()
+            valor_coluna = (await valor_element.inner_text()).strip() if valor_element else (await tds[1].inner_text()).strip()
+            dados_tabela[nome_coluna] = valor_coluna
+            ultima_label = nome_coluna
+        elif len(tds) == 1:
+            valor_element = await tds[0].query_selector('p, strong')
+            valor_coluna = (await valor_element.inner_text()).strip() if valor_element else (await tds[0].inner_text()).strip()
+            if ultima_label and 'noborder' in (await tds[0].get_attribute('class') or ''):
+                dados_tabela[ultima_label] = valor_coluna
+
+    return {
+        "MarcaSelecionada": marca,
+        "ModeloSelecionado": modelo,
+        "AnoSelecionado": ano_modelo,
+        "CodigoFipe": codigo_fipe,
+        "PrecoMedio": preco_medio,
+        "Mes Referencia": mes_referencia,
+        **dados_tabela
+    }
+
+async def medir(nome, funcao, page):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        dados = await funcao(page)
+    total = time.perf_counter() - inicio
+    logging.info(f"{nome}: {total / REPETICOES * 1000:.2f} ms por registro ({REPETICOES} repetições)")
+    return dados, total
+
+async def run():
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+        page = await browser.new_page()
+        await page.set_content(FIXTURE.read_text(encoding="utf-8"))
+
+        dados_antigo, t_antigo = await medir("Loop antigo", extrair_loop_antigo, page)
+        dados_novo, t_novo = await medir("Evaluate único", lambda pg: extrair_tabela_resultado(pg, TABELA_ID), page)
+
+        for chave in ("CodigoFipe", "PrecoMedio", "Mes Referencia", "MarcaSelecionada", "ModeloSelecionado", "AnoSelecionado"):
+            if dados_antigo[chave] != dados_novo[chave]:
+                logging.warning(f"[DIFERENÇA] {chave}: antigo='{dados_antigo[chave]}' novo='{dados_novo[chave]}'")
+
+        logging.info(f"Speedup: {t_antigo / t_novo:.1f}x")
+        await browser.close()
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.perfis import PERFIS
+
+
+# Nomes dos temporários por worker dos CodigoFipe_*.py de antes do motor único
+@pytest.mark.parametrize("tipo, nome", [
+    ("carro", "Fipe_temp_teste21.xlsx"),
+    ("moto", "Fipe_temp_teste_motos1.xlsx"),
+    ("caminhao", "Fipe_temp_teste_caminhao1.xlsx"),
+])
+def test_arquivos_temp_codigo_inclui_nomes_antigos(tmp_path, tipo, nome):
+    (tmp_path / nome).write_bytes(b"")
+    (tmp_path / f"{PERFIS[tipo].prefixo_temp_codigo}_w0.xlsx").write_bytes(b"")
+    arquivos = [os.path.basename(f) for f in PERFIS[tipo].arquivos_temp_codigo(str(tmp_path))]
+    assert nome in arquivos
+    assert f"{PERFIS[tipo].prefixo_temp_codigo}_w0.xlsx" in arquivos
+
+
+def test_arquivos_temp_codigo_nao_mistura_tipos(tmp_path):
+    (tmp_path / "Fipe_temp_teste_motos1.xlsx").write_bytes(b"")
+    assert PERFIS["carro"].arquivos_temp_codigo(str(tmp_path)) == []
+    assert PERFIS["caminhao"].arquivos_temp_codigo(str(tmp_path)) == []
+
+
+def test_consolidar_le_temporario_antigo(tmp_path, monkeypatch):
+    pd = pytest.importorskip("pandas")
+    pytest.importorskip("openpyxl")
+    pytest.importorskip("playwright")
+    pytest.importorskip("aiohttp")
+    from nucleo_fipe.motor_codigo import consolidar
+
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame([{
+        "CodigoFipe": "001004-9", "AnoSelecionado": "1992 Gasolina", "Mes Referencia": "julho de 2025",
+        "PrecoMedio": "12345.00",
+    }]).to_excel("Fipe_temp_teste21.xlsx", index=False)
+
+    consolidar("carro", dataset=False)
+
+    final = pd.read_excel(PERFIS["carro"].arquivo_final_codigo, dtype=str)
+    assert final["CodigoFipe"].tolist() == ["001004-9"]
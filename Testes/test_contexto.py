@@ -0,0 +1,32 @@
+import os
+import sys
+
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.contexto import _id_pagina, _host_permitido, HOSTS_PERMITIDOS, TIPOS_BLOQUEADOS
+
+
+class PaginaFalsa:
+    pass
+
+
+# Página nova no mesmo endereço de memória de uma reciclada não herda as métricas da antiga
+def test_id_pagina_nao_reaproveita_identificador():
+    antiga = PaginaFalsa()
+    id_antiga = _id_pagina(antiga)
+    assert _id_pagina(antiga) == id_antiga
+    del antiga
+    nova = PaginaFalsa()
+    assert _id_pagina(nova) != id_antiga
+
+
+def test_hosts_permitidos():
+    assert _host_permitido("veiculos.fipe.org.br", HOSTS_PERMITIDOS)
+    assert _host_permitido("code.jquery.com", HOSTS_PERMITIDOS)
+    assert not _host_permitido("www.google-analytics.com", HOSTS_PERMITIDOS)
+    assert not _host_permitido("fipe.org.br.exemplo.com", HOSTS_PERMITIDOS)
+
+
+def test_other_nao_e_bloqueado():
+    assert "other" not in TIPOS_BLOQUEADOS
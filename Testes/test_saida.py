@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+# Permite importar o pacote compartilhado nucleo_fipe a partir da raiz do repositório
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nucleo_fipe.saida import criar_saida, ler_registros
+
+
+def _registro(ano, preco="10000.00"):
+    return {"CodigoFipe": "001004-9", "AnoSelecionado": f"{ano} Gasolina", "Mes Referencia": "julho de 2025", "PrecoMedio": preco}
+
+
+# Duas saídas do mesmo processo, na mesma pasta e no mesmo segundo, não podem escrever no mesmo segmento
+@pytest.mark.parametrize("formato", ["jsonl", "csv"])
+def test_duas_saidas_na_mesma_pasta_nao_colidem(tmp_path, formato):
+    pasta = str(tmp_path / "registros")
+    primeira = criar_saida(pasta, formato, tipo="carro")
+    segunda = criar_saida(pasta, formato, tipo="carro")
+    for ano in (1992, 1993):
+        primeira.gravar(_registro(ano))
+    for ano in (1994, 1995):
+        segunda.gravar(_registro(ano))
+    primeira.fechar()
+    segunda.fechar()
+
+    df = ler_registros(pasta, "carro")
+    assert sorted(df["AnoSelecionado"]) == ["1992 Gasolina", "1993 Gasolina", "1994 Gasolina", "1995 Gasolina"]
+
+
+# "Zero KM Gasolina" (API) e "32000 Gasolina" (tabela do site) são o mesmo veículo: a segunda gravação é upsert
+def test_zero_km_nas_duas_grafias_tem_a_mesma_chave(tmp_path):
+    pasta = str(tmp_path / "registros")
+    saida = criar_saida(pasta, "jsonl", tipo="carro")
+    saida.gravar({**_registro(2025), "AnoSelecionado": "Zero KM Gasolina", "PrecoMedio": "90000.00"})
+    saida.gravar({**_registro(2025), "AnoSelecionado": "32000  gasolina", "PrecoMedio": "91000.00"})
+    saida.fechar()
+
+    df = ler_registros(pasta, "carro")
+    assert len(df) == 1
+    assert df["PrecoMedio"].tolist() == ["91000.00"]
+
+
+def test_normalizar_ano():
+    from nucleo_fipe.saida import normalizar_ano
+
+    assert normalizar_ano("Zero KM Gasolina") == normalizar_ano("32000 Gasolina")
+    assert normalizar_ano(" 1992  Gasolina ") == normalizar_ano("1992 gasolina")
+    assert normalizar_ano("1992 Gasolina") != normalizar_ano("1993 Gasolina")
@@ -0,0 +1 @@
+# Pacote compartilhado pelos scripts de scraping da FIPE (carros, motos e caminhões)
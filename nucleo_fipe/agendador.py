@@ -0,0 +1,146 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Agendador com roubo de trabalho: cada worker tem sua fila (deque) e consome pela frente;
+# quando a sua acaba, rouba do fim da fila do worker com mais trabalho pendente.
+# As tarefas são distribuídas em blocos contíguos, então cada worker tende a ficar no mesmo
+# tipo/mês (página do pool continua aquecida) e só muda de contexto quando rouba.
+# Com lpt=True a distribuição segue "maior tarefa primeiro" (LPT) pelo custo estimado.
+# Tarefas podem gerar novas tarefas (adicionar) durante a execução: um worker sem fila só
+# encerra quando ninguém mais está executando, porque alguém ainda pode enfileirar trabalho.
+# Com "controle" (ControladorConcorrencia) só controle.limite workers executam ao mesmo tempo;
+# n_workers é o teto.
+class AgendadorTrabalho:
+    def __init__(self, n_workers, custo=None, controle=None):
+        self.n_workers = n_workers
+        self.custo = custo or (lambda item: 1.0)
+        self.controle = controle
+        self.filas = [deque() for _ in range(n_workers)]
+        self.ocupado = [0.0] * n_workers
+        self.executadas = [0] * n_workers
+        self.roubos = 0
+        self.maior_tarefa = 0.0
+        self.custo_estimado = 0.0
+        self.maior_estimada = 0.0
+        self.em_execucao = 0
+        self.novas = None
+        self.inicio = None
+        self.fim = None
+
+    def pendentes(self):
+        return sum(len(f) for f in self.filas)
+
+    def _carga(self, worker_id):
+        return sum(self.custo(item) for item in self.filas[worker_id])
+
+    # Divide os itens em n blocos contíguos de custo parecido, ou (lpt=True) ordena do maior para
+    # o menor custo e entrega cada um ao worker menos carregado: a maior marca começa primeiro
+    # e as pequenas preenchem o fim da execução, em vez de uma marca gigante pega por último dominar a cauda
+    def distribuir(self, itens, lpt=False):
+        itens = list(itens)
+        custos = [self.custo(i) for i in itens]
+        self.custo_estimado += sum(custos)
+        self.maior_estimada = max([self.maior_estimada] + custos)
+
+        if lpt:
+            cargas = [self._carga(w) for w in range(self.n_workers)]
+            for item, custo in sorted(zip(itens, custos), key=lambda par: par[1], reverse=True):
+                worker_id = min(range(self.n_workers), key=lambda w: cargas[w])
+                self.filas[worker_id].append(item)
+                cargas[worker_id] += custo
+            return
+
+        total = sum(custos)
+        alvo = total / self.n_workers if self.n_workers else total
+        worker_id, acumulado = 0, 0.0
+        for item in itens:
+            if acumulado >= alvo * (worker_id + 1) and worker_id < self.n_workers - 1:
+                worker_id += 1
+            self.filas[worker_id].append(item)
+            acumulado += self.custo(item)
+
+    # Tarefa nova (ex.: retentativa) vai para o worker indicado ou para o menos carregado
+    def adicionar(self, item, worker_id=None):
+        if worker_id is None:
+            worker_id = min(range(self.n_workers), key=self._carga)
+        self.filas[worker_id].append(item)
+        if self.novas:
+            self.novas.set()
+
+    def proxima(self, worker_id):
+        if self.filas[worker_id]:
+            return self.filas[worker_id].popleft()
+        vitima = max(range(self.n_workers), key=self._carga)
+        if not self.filas[vitima]:
+            return None
+        self.roubos += 1
+        return self.filas[vitima].pop()
+
+    @asynccontextmanager
+    async def _vaga(self):
+        if self.controle is None:
+            yield
+            return
+        async with self.controle.vaga():
+            yield
+
+    async def _rodar(self, item, worker_id, funcao):
+        self.em_execucao += 1
+        inicio = time.perf_counter()
+        try:
+            await funcao(item, worker_id)
+        except Exception as e:
+            logging.error(f"[AGENDADOR] Worker {worker_id} falhou em {item}: {e}")
+        finally:
+            duracao = time.perf_counter() - inicio
+            self.ocupado[worker_id] += duracao
+            self.executadas[worker_id] += 1
+            self.maior_tarefa = max(self.maior_tarefa, duracao)
+            self.em_execucao -= 1
+            self.novas.set()
+
+    async def _worker(self, worker_id, funcao):
+        while True:
+            # A vaga é pega antes da tarefa: worker sem vaga não segura trabalho que outro poderia roubar
+            async with self._vaga():
+                item = self.proxima(worker_id)
+                if item is not None:
+                    await self._rodar(item, worker_id, funcao)
+                    continue
+            if self.em_execucao == 0:
+                self.novas.set()
+                return
+            self.novas.clear()
+            await self.novas.wait()
+
+    # Roda funcao(item, worker_id) para todos os itens com n_workers tarefas assíncronas
+    async def executar(self, funcao):
+        self.novas = asyncio.Event()
+        self.inicio = time.perf_counter()
+        await asyncio.gather(*(self._worker(w, funcao) for w in range(self.n_workers)))
+        self.fim = time.perf_counter()
+
+    # Makespan real x limite inferior max(trabalho total / workers, maior tarefa): nenhum agendamento faz melhor
+    def logar(self):
+        if self.inicio is None or self.fim is None:
+            return
+        makespan = self.fim - self.inicio
+        ideal = sum(self.ocupado) / self.n_workers if self.n_workers else 0.0
+        limite_inferior = max(ideal, self.maior_tarefa)
+        razao = makespan / limite_inferior if limite_inferior else 1.0
+        logging.info(
+            f"[AGENDADOR] makespan {makespan:.0f}s, limite inferior {limite_inferior:.0f}s "
+            f"(trabalho/workers {ideal:.0f}s, maior tarefa {self.maior_tarefa:.0f}s) -> {razao:.2f}x do ótimo, "
+            f"{self.roubos} roubos"
+        )
+        if self.custo_estimado and self.n_workers:
+            limite_estimado = max(self.custo_estimado / self.n_workers, self.maior_estimada)
+            logging.info(
+                f"[AGENDADOR] Estimativa prévia: {self.custo_estimado:.0f} de custo, limite inferior {limite_estimado:.0f} "
+                f"(maior tarefa {self.maior_estimada:.0f})"
+            )
+        for w in range(self.n_workers):
+            logging.info(f"[AGENDADOR] Worker {w}: {self.executadas[w]} tarefas, {self.ocupado[w]:.0f}s ocupado")
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from nucleo_fipe.limitador import adquirir
+
+# Endpoints usados pelo próprio site veiculos.fipe.org.br quando os dropdowns são preenchidos
+URL_BASE = "https://veiculos.fipe.org.br/api/veiculos"
+
+HEADERS = {
+    "Referer": "https://veiculos.fipe.org.br/",
+    "Origin": "https://veiculos.fipe.org.br",
+    "X-Requested-With": "XMLHttpRequest",
+    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+}
+
+# Código numérico que o backend espera em codigoTipoVeiculo
+TIPOS_VEICULO = {
+    "carro": 1,
+    "moto": 2,
+    "caminhao": 3,
+}
+
+# Ano que a FIPE usa para representar veículos 0 km
+ANO_ZERO_KM = 32000
+
+
+class ErroApiFipe(Exception):
+    pass
+
+
+# Converte "R$ 12.345,00" no mesmo formato que o scraping pelo navegador grava em PrecoMedio
+def limpar_preco(valor):
+    return (valor or "").strip().replace('R$', '').replace('.', '').replace(',', '.').strip()
+
+
+# Monta o mesmo dicionário "dados" que o processar_modelo do motor gera lendo a tabela de resultado
+def montar_dados(resposta, ano_label=None):
+    ano_modelo = resposta.get("AnoModelo")
+    if ano_label:
+        ano_selecionado = ano_label.strip()
+    elif ano_modelo == ANO_ZERO_KM:
+        ano_selecionado = f"Zero KM {resposta.get('Combustivel', '')}".strip()
+    else:
+        ano_selecionado = f"{ano_modelo} {resposta.get('Combustivel', '')}".strip()
+
+    mes_referencia = (resposta.get("MesReferencia") or "").strip()
+    codigo_fipe = (resposta.get("CodigoFipe") or "").strip()
+    marca = (resposta.get("Marca") or "").strip()
+    modelo = (resposta.get("Modelo") or "").strip()
+    valor = (resposta.get("Valor") or "").strip()
+
+    # Mesmas colunas que o loop da tabela (dados_tabela) produz no navegador
+    dados_tabela = {
+        "Mês de referência": mes_referencia,
+        "Código Fipe": codigo_fipe,
+        "Marca": marca,
+        "Modelo": modelo,
+        "Ano Modelo": ano_selecionado,
+        "Autenticação": (resposta.get("Autenticacao") or "").strip(),
+        "Data da consulta": (resposta.get("DataConsulta") or "").strip(),
+        "Preço Médio": valor,
+    }
+
+    return {
+        "MarcaSelecionada": marca,
+        "ModeloSelecionado": modelo,
+        "AnoSelecionado": ano_selecionado,
+        "CodigoFipe": codigo_fipe,
+        "PrecoMedio": limpar_preco(valor),
+        "Mes Referencia": mes_referencia,
+        **dados_tabela
+    }
+
+
+# Formulário do ConsultarValorComTodosParametros. O Value do ano vem como "2015-1": ano modelo e código do combustível
+def parametros_valor(tipo, codigo_tabela, codigo_marca, codigo_modelo, ano_value):
+    ano_modelo, codigo_combustivel = str(ano_value).split("-", 1)
+    return {
+        "codigoTabelaReferencia": codigo_tabela,
+        "codigoMarca": codigo_marca,
+        "codigoModelo": codigo_modelo,
+        "codigoTipoVeiculo": TIPOS_VEICULO[tipo],
+        "anoModelo": ano_modelo,
+        "codigoTipoCombustivel": codigo_combustivel,
+        "tipoVeiculo": tipo,
+        "modeloCodigoExterno": "",
+        "tipoConsulta": "tradicional",
+    }
+
+
+# Cliente assíncrono com pool de conexões para os endpoints da FIPE
+class ClienteFipeApi:
+    def __init__(self, tipo="carro", max_conexoes=8, timeout=30, tentativas=3):
+        if tipo not in TIPOS_VEICULO:
+            raise ValueError(f"Tipo de veículo inválido: {tipo}")
+        self.tipo = tipo
+        self.codigo_tipo = TIPOS_VEICULO[tipo]
+        self.max_conexoes = max_conexoes
+        self.timeout = timeout
+        self.tentativas = tentativas
+        self.sessao = None
+
+    async def __aenter__(self):
+        conector = aiohttp.TCPConnector(limit=self.max_conexoes, keepalive_timeout=60)
+        self.sessao = aiohttp.ClientSession(
+            connector=conector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.sessao.close()
+
+    async def _post(self, endpoint, dados=None):
+        url = f"{URL_BASE}/{endpoint}"
+        for tentativa in range(1, self.tentativas + 1):
+            await adquirir("api")
+            try:
+                async with self.sessao.post(url, data=dados or {}) as resp:
+                    resp.raise_for_status()
+                    corpo = await resp.json(content_type=None)
+                if isinstance(corpo, dict) and corpo.get("erro"):
+                    raise ErroApiFipe(f"{endpoint}: {corpo['erro']}")
+                return corpo
+            except ErroApiFipe:
+                raise
+            except Exception as e:
+                logging.warning(f"[API] {endpoint} tentativa {tentativa}/{self.tentativas} falhou: {e}")
+                if tentativa == self.tentativas:
+                    raise
+                await asyncio.sleep(tentativa)
+
+    # Lista de meses: [{"Codigo": 320, "Mes": "julho/2025 "}, ...]
+    async def tabelas_referencia(self):
+        tabelas = await self._post("ConsultarTabelaDeReferencia")
+        return [{"Codigo": t["Codigo"], "Mes": t["Mes"].strip()} for t in tabelas]
+
+    async def marcas(self, codigo_tabela):
+        return await self._post("ConsultarMarcas", {
+            "codigoTabelaReferencia": codigo_tabela,
+            "codigoTipoVeiculo": self.codigo_tipo,
+        })
+
+    async def modelos(self, codigo_tabela, codigo_marca):
+        resposta = await self._post("ConsultarModelos", {
+            "codigoTipoVeiculo": self.codigo_tipo,
+            "codigoTabelaReferencia": codigo_tabela,
+            "codigoMarca": codigo_marca,
+        })
+        return resposta.get("Modelos", [])
+
+    async def anos_modelo(self, codigo_tabela, codigo_marca, codigo_modelo):
+        return await self._post("ConsultarAnoModelo", {
+            "codigoTipoVeiculo": self.codigo_tipo,
+            "codigoTabelaReferencia": codigo_tabela,
+            "codigoMarca": codigo_marca,
+            "codigoModelo": codigo_modelo,
+        })
+
+    async def valor(self, codigo_tabela, codigo_marca, codigo_modelo, ano_value):
+        return await self._post("ConsultarValorComTodosParametros",
+                                parametros_valor(self.tipo, codigo_tabela, codigo_marca, codigo_modelo, ano_value))
+
+
+# Coleta todos os modelos/anos de uma marca direto nos endpoints, com várias consultas em paralelo.
+# Devolve (registros, falhas): com alguma falha a marca não deve ser marcada como processada
+async def coletar_marca_api(cliente, codigo_tabela, marca, max_modelos=None, max_anos=None, concorrencia=8):
+    nome_marca = marca["Label"].strip()
+    modelos = await cliente.modelos(codigo_tabela, marca["Value"])
+    if max_modelos is not None:
+        modelos = modelos[:max_modelos]
+    logging.info(f"[API] Marca {nome_marca}: {len(modelos)} modelos")
+
+    limite = asyncio.Semaphore(concorrencia)
+    registros = []
+    falhas = 0
+
+    async def consultar(modelo, ano):
+        nonlocal falhas
+        async with limite:
+            try:
+                resposta = await cliente.valor(codigo_tabela, marca["Value"], modelo["Value"], ano["Value"])
+                registros.append(montar_dados(resposta, ano_label=ano["Label"]))
+            except Exception as e:
+                falhas += 1
+                logging.warning(f"[API] Falha em {nome_marca} / {modelo['Label']} / {ano['Label']}: {e}")
+
+    async def processar_modelo(modelo):
+        nonlocal falhas
+        try:
+            async with limite:
+                anos = await cliente.anos_modelo(codigo_tabela, marca["Value"], modelo["Value"])
+        except Exception as e:
+            falhas += 1
+            logging.warning(f"[API] Falha ao listar anos de {nome_marca} / {modelo['Label']}: {e}")
+            return
+        if max_anos is not None:
+            anos = anos[:max_anos]
+        await asyncio.gather(*(consultar(modelo, ano) for ano in anos))
+
+    await asyncio.gather(*(processar_modelo(modelo) for modelo in modelos))
+
+    logging.info(f"[API] Marca {nome_marca}: {len(registros)} registros coletados, {falhas} falhas")
+    return registros, falhas
@@ -0,0 +1,257 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+
+# Banco único com o estado das coletas (todos os tipos e meses): unidades de trabalho com status,
+# tentativas, tempos e dono da reserva, histórico de erros e meses concluídos.
+# WAL deixa vários processos lerem enquanto um grava. Conclusões e falhas são gravadas em lotes (acumuladas
+# em memória e aplicadas numa transação curta, no máximo "intervalo" segundos depois: confirmar_vencido);
+# reservas e liberações têm commit na hora, só delas.
+ARQUIVO_BANCO = "estado_coleta.db"
+
+# Reserva de uma unidade por um processo; vencida, outro processo pode pegar
+SEGUNDOS_RESERVA = 600
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS unidades (
+    mes TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    marca TEXT NOT NULL,
+    modelo TEXT NOT NULL DEFAULT '',
+    ano TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'pendente',
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    inicio REAL,
+    fim REAL,
+    duracao REAL,
+    erro TEXT,
+    dono TEXT,
+    reserva_ate REAL,
+    PRIMARY KEY (mes, tipo, marca, modelo, ano)
+);
+CREATE INDEX IF NOT EXISTS idx_unidades_status ON unidades (tipo, mes, status);
+CREATE INDEX IF NOT EXISTS idx_unidades_reserva ON unidades (status, reserva_ate);
+
+CREATE TABLE IF NOT EXISTS erros (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mes TEXT, tipo TEXT, marca TEXT, modelo TEXT, ano TEXT,
+    classe TEXT,
+    mensagem TEXT,
+    momento REAL
+);
+CREATE INDEX IF NOT EXISTS idx_erros_unidade ON erros (tipo, mes, marca, modelo);
+
+CREATE TABLE IF NOT EXISTS meses (
+    tipo TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    concluido_em REAL,
+    PRIMARY KEY (tipo, mes)
+);
+"""
+
+
+# Chave (mes, tipo, marca, modelo, ano) com None vira '' no banco: NULL não participa de chave primária
+def _para_banco(chave):
+    mes, tipo, marca, modelo, ano = chave
+    return (mes, tipo, marca, modelo or "", ano or "")
+
+
+def _do_banco(linha):
+    mes, tipo, marca, modelo, ano = linha
+    return (mes, tipo, marca, modelo or None, ano or None)
+
+
+class BancoEstado:
+    def __init__(self, caminho=ARQUIVO_BANCO, lote=50, intervalo=5.0):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo = intervalo
+        self.dono = f"{socket.gethostname()}:{os.getpid()}"
+        self.conexao = sqlite3.connect(caminho, timeout=30)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+        self.conexao.executescript(ESQUEMA)
+        self.conexao.commit()
+        self.escritas = []
+        self.concluidas_pendentes = set()
+        self.ultimo_commit = time.monotonic()
+        self.antes_de_confirmar = []
+
+    # funcao() roda antes de cada commit de lote, ex.: descarregar a saída de registros, para nenhuma unidade
+    # ficar concluída no banco sem o registro dela já gravado em disco
+    def ao_confirmar(self, funcao):
+        self.antes_de_confirmar.append(funcao)
+
+    # Conclusões e falhas esperam o lote em memória (não na transação da conexão): assim reservas e liberações
+    # fazem commit só delas, sem levar junto conclusões cujos registros ainda não foram descarregados e sem
+    # forçar uma descarga da saída (um Parquet por descarga) a cada reserva.
+    # Lote aplicado a cada "lote" escritas ou "intervalo" segundos
+    def _escreveu(self, sql, args):
+        self.escritas.append((sql, args))
+        if len(self.escritas) >= self.lote or time.monotonic() - self.ultimo_commit >= self.intervalo:
+            self.confirmar()
+
+    # Commit do lote pendente se o intervalo já passou, mesmo sem escrita nova. Roda como tarefa periódica
+    # do ator: conclusões de um processo parado (navegando, esperando o site) não ficam presas na memória
+    def confirmar_vencido(self):
+        if self.escritas and time.monotonic() - self.ultimo_commit >= self.intervalo:
+            self.confirmar()
+
+    def confirmar(self):
+        if self.escritas:
+            for funcao in self.antes_de_confirmar:
+                funcao()
+            for sql, args in self.escritas:
+                self.conexao.execute(sql, args)
+        self.conexao.commit()
+        self.escritas = []
+        self.concluidas_pendentes.clear()
+        self.ultimo_commit = time.monotonic()
+
+    # Commit só do que já está na conexão (reserva, liberação), sem aplicar o lote nem descarregar a saída
+    def _confirmar_reserva(self):
+        self.conexao.commit()
+
+    def concluida(self, chave):
+        if _para_banco(chave) in self.concluidas_pendentes:
+            return True
+        linha = self.conexao.execute(
+            "SELECT 1 FROM unidades WHERE mes=? AND tipo=? AND marca=? AND modelo=? AND ano=? AND status='concluida'",
+            _para_banco(chave)
+        ).fetchone()
+        return linha is not None
+
+    # Chaves concluídas de um tipo (opcionalmente só dos meses pedidos), para montar o plano
+    def concluidas(self, tipo, meses=None):
+        sql = "SELECT mes, tipo, marca, modelo, ano FROM unidades WHERE tipo=? AND status='concluida'"
+        args = [tipo]
+        if meses is not None:
+            meses = list(meses)
+            sql += f" AND mes IN ({', '.join('?' * len(meses))})"
+            args += meses
+        chaves = {_do_banco(l) for l in self.conexao.execute(sql, args)}
+        chaves |= {_do_banco(c) for c in self.concluidas_pendentes if c[1] == tipo and (meses is None or c[0] in meses)}
+        return chaves
+
+    def modelos_concluidos(self, tipo, mes, marca):
+        modelos = {m for (m,) in self.conexao.execute(
+            "SELECT modelo FROM unidades WHERE tipo=? AND mes=? AND marca=? AND modelo!='' AND ano='' AND status='concluida'",
+            (tipo, mes, marca)
+        )}
+        modelos |= {c[3] for c in self.concluidas_pendentes if c[:3] == (mes, tipo, marca) and c[3] and not c[4]}
+        return len(modelos)
+
+    def concluir(self, chave, duracao=None):
+        agora = time.time()
+        self.concluidas_pendentes.add(_para_banco(chave))
+        self._escreveu(
+            """INSERT INTO unidades (mes, tipo, marca, modelo, ano, status, tentativas, inicio, fim, duracao)
+               VALUES (?, ?, ?, ?, ?, 'concluida', 1, ?, ?, ?)
+               ON CONFLICT (mes, tipo, marca, modelo, ano) DO UPDATE SET
+                   status='concluida', tentativas=tentativas + 1, fim=excluded.fim,
+                   inicio=COALESCE(excluded.inicio, inicio), duracao=COALESCE(excluded.duracao, duracao),
+                   erro=NULL, dono=NULL, reserva_ate=NULL""",
+            _para_banco(chave) + (agora - duracao if duracao else None, agora, duracao)
+        )
+
+    def registrar_falha(self, chave, classe, mensagem):
+        agora = time.time()
+        mensagem = str(mensagem)[:500]
+        self.concluidas_pendentes.discard(_para_banco(chave))
+        self.escritas.append((
+            """INSERT INTO unidades (mes, tipo, marca, modelo, ano, status, tentativas, fim, erro)
+               VALUES (?, ?, ?, ?, ?, 'falhou', 1, ?, ?)
+               ON CONFLICT (mes, tipo, marca, modelo, ano) DO UPDATE SET
+                   status='falhou', tentativas=tentativas + 1, fim=excluded.fim, erro=excluded.erro,
+                   dono=NULL, reserva_ate=NULL""",
+            _para_banco(chave) + (agora, f"{classe}: {mensagem}")
+        ))
+        self._escreveu(
+            "INSERT INTO erros (mes, tipo, marca, modelo, ano, classe, mensagem, momento) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            _para_banco(chave) + (classe, mensagem, agora)
+        )
+
+    # Reserva a unidade para este processo; False se outro processo tem reserva válida ou já concluiu.
+    # Commit na hora: a reserva só vale para os outros processos depois de gravada
+    def reservar(self, chave, segundos=SEGUNDOS_RESERVA):
+        agora = time.time()
+        valores = _para_banco(chave)
+        self.conexao.execute(
+            "INSERT OR IGNORE INTO unidades (mes, tipo, marca, modelo, ano) VALUES (?, ?, ?, ?, ?)", valores
+        )
+        cursor = self.conexao.execute(
+            """UPDATE unidades SET status='em_andamento', dono=?, reserva_ate=?, inicio=?
+               WHERE mes=? AND tipo=? AND marca=? AND modelo=? AND ano=? AND status!='concluida'
+                 AND (dono IS NULL OR dono=? OR reserva_ate < ?)""",
+            (self.dono, agora + segundos, agora) + valores + (self.dono, agora)
+        )
+        self._confirmar_reserva()
+        return cursor.rowcount == 1
+
+    def liberar(self, chave):
+        self.conexao.execute(
+            """UPDATE unidades SET dono=NULL, reserva_ate=NULL,
+                   status=CASE WHEN status='em_andamento' THEN 'pendente' ELSE status END
+               WHERE mes=? AND tipo=? AND marca=? AND modelo=? AND ano=? AND dono=?""",
+            _para_banco(chave) + (self.dono,)
+        )
+        self._confirmar_reserva()
+
+    def mes_concluido(self, tipo, mes):
+        return self.conexao.execute("SELECT 1 FROM meses WHERE tipo=? AND mes=?", (tipo, mes)).fetchone() is not None
+
+    def concluir_mes(self, tipo, mes):
+        self.conexao.execute("INSERT OR REPLACE INTO meses (tipo, mes, concluido_em) VALUES (?, ?, ?)", (tipo, mes, time.time()))
+        self.confirmar()
+
+    # Traz para o banco o progresso dos arquivos antigos (diário .jsonl e meses_processados_*.json), uma vez por tipo
+    def importar_legado(self, tipo, arquivo_diario=None, arquivo_meses=None):
+        if self.conexao.execute("SELECT 1 FROM unidades WHERE tipo=? LIMIT 1", (tipo,)).fetchone():
+            return
+        importadas = 0
+        if arquivo_diario and os.path.exists(arquivo_diario):
+            with open(arquivo_diario, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        chave = tuple(json.loads(linha))
+                    except ValueError:
+                        continue
+                    self.conexao.execute(
+                        "INSERT OR IGNORE INTO unidades (mes, tipo, marca, modelo, ano, status, tentativas) VALUES (?, ?, ?, ?, ?, 'concluida', 1)",
+                        _para_banco(chave)
+                    )
+                    importadas += 1
+        if arquivo_meses and os.path.exists(arquivo_meses):
+            try:
+                with open(arquivo_meses, "r", encoding="utf-8") as f:
+                    meses = json.load(f)
+            except Exception as e:
+                logging.warning(f"[BANCO] Erro lendo {arquivo_meses}: {e}")
+                meses = {}
+            for mes, feito in meses.items():
+                if feito:
+                    self.conexao.execute("INSERT OR IGNORE INTO meses (tipo, mes) VALUES (?, ?)", (tipo, mes))
+        self.confirmar()
+        if importadas:
+            logging.info(f"[BANCO] {importadas} chaves de {tipo} importadas de {arquivo_diario}")
+
+    def logar(self, tipo=None):
+        filtro, args = ("WHERE tipo=?", (tipo,)) if tipo else ("", ())
+        linhas = self.conexao.execute(
+            f"SELECT tipo, status, COUNT(*), AVG(duracao) FROM unidades {filtro} GROUP BY tipo, status ORDER BY tipo, status", args
+        ).fetchall()
+        for t, status, n, media in linhas:
+            tempo = f", {media:.1f}s em média" if media else ""
+            logging.info(f"[BANCO] {t}: {n} unidades {status}{tempo}")
+        erros = self.conexao.execute(
+            f"SELECT classe, COUNT(*) FROM erros {filtro} GROUP BY classe ORDER BY COUNT(*) DESC", args
+        ).fetchall()
+        if erros:
+            logging.info("[BANCO] Erros por classe: " + ", ".join(f"{c}: {n}" for c, n in erros))
+
+    def fechar(self):
+        self.confirmar()
+        self.conexao.close()
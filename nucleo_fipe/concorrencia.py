@@ -0,0 +1,118 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Respostas do site que indicam sobrecarga ou bloqueio
+STATUS_RECUO = {429, 500, 502, 503, 504}
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p * (len(ordenados) - 1))))]
+
+
+# Controle AIMD de quantos workers pesquisam ao mesmo tempo: a cada "janela" consultas saudáveis
+# (p95 da latência e taxa de erro dentro do limite) libera mais um worker; em timeout, HTTP 429/5xx
+# ou resultado vazio corta o limite pela metade. Depois de um corte espera "resfriamento" segundos
+# antes de cortar de novo, para uma rajada de erros da mesma sobrecarga não derrubar tudo para 1.
+class ControladorConcorrencia:
+    def __init__(self, minimo=1, maximo=3, inicial=None, janela=20, p95_max=10.0, taxa_erro_max=0.05,
+                 fator_recuo=0.5, resfriamento=30.0):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.limite = min(maximo, inicial or minimo)
+        self.janela = janela
+        self.p95_max = p95_max
+        self.taxa_erro_max = taxa_erro_max
+        self.fator_recuo = fator_recuo
+        self.resfriamento = resfriamento
+        self.amostras = deque(maxlen=janela)
+        self.ultimo_recuo = None
+        self.ativos = 0
+        self.mudancas = []
+        self._condicao = None
+
+    # Reinicia o controle para uma nova execução (ex.: teto = número de páginas do pool)
+    def configurar(self, maximo=None, inicial=None, **opcoes):
+        if maximo is not None:
+            self.maximo = maximo
+        for nome, valor in opcoes.items():
+            setattr(self, nome, valor)
+        self.limite = max(self.minimo, min(self.maximo, inicial or self.minimo))
+        self.amostras = deque(maxlen=self.janela)
+        self.ultimo_recuo = None
+        self.mudancas = []
+        self._condicao = None
+
+    def _mudar(self, novo, motivo):
+        if novo == self.limite:
+            return
+        logging.info(f"[AIMD] Concorrência {self.limite} -> {novo} ({motivo})")
+        self.mudancas.append((time.time(), self.limite, novo, motivo))
+        self.limite = novo
+        self.amostras.clear()
+        if self._condicao:
+            self._notificar()
+
+    def _notificar(self):
+        async def avisar():
+            async with self._condicao:
+                self._condicao.notify_all()
+        try:
+            asyncio.get_running_loop().create_task(avisar())
+        except RuntimeError:
+            pass
+
+    def registrar_sucesso(self, latencia):
+        self.amostras.append((latencia, True))
+        if len(self.amostras) < self.janela:
+            return
+        latencias = [l for l, ok in self.amostras if ok]
+        taxa_erro = sum(1 for _, ok in self.amostras if not ok) / len(self.amostras)
+        p95 = _percentil(latencias, 0.95)
+        if p95 <= self.p95_max and taxa_erro <= self.taxa_erro_max and self.limite < self.maximo:
+            self._mudar(self.limite + 1, f"p95 {p95:.1f}s, erros {taxa_erro:.0%}")
+        else:
+            self.amostras.clear()
+
+    def registrar_falha(self, motivo):
+        self.amostras.append((0.0, False))
+        agora = time.monotonic()
+        if self.ultimo_recuo is not None and agora - self.ultimo_recuo < self.resfriamento:
+            return
+        self.ultimo_recuo = agora
+        self._mudar(max(self.minimo, int(self.limite * self.fator_recuo)), motivo)
+
+    # Falha HTTP vista numa resposta do site (só os status de sobrecarga contam)
+    def registrar_status(self, status):
+        if status in STATUS_RECUO:
+            self.registrar_falha(f"HTTP {status}")
+
+    # Segura uma vaga enquanto houver "limite" workers ativos
+    @asynccontextmanager
+    async def vaga(self):
+        if self._condicao is None:
+            self._condicao = asyncio.Condition()
+        async with self._condicao:
+            await self._condicao.wait_for(lambda: self.ativos < self.limite)
+            self.ativos += 1
+        try:
+            yield
+        finally:
+            async with self._condicao:
+                self.ativos -= 1
+                self._condicao.notify_all()
+
+    def logar(self):
+        subidas = sum(1 for _, antes, depois, _ in self.mudancas if depois > antes)
+        logging.info(
+            f"[AIMD] Concorrência final {self.limite} (teto {self.maximo}); "
+            f"{subidas} aumentos, {len(self.mudancas) - subidas} recuos"
+        )
+
+
+controle_concorrencia = ControladorConcorrencia()
@@ -0,0 +1,116 @@
+import time
+import logging
+import itertools
+from urllib.parse import urlparse
+
+from nucleo_fipe.limitador import adquirir
+
+URL_FIPE = "https://veiculos.fipe.org.br/"
+
+# Tipos de recurso que o scraping nunca usa. CSS fica de fora por padrão: o chosen
+# depende dele para esconder/mostrar as listas e as esperas por "visible" quebrariam.
+# "other" também fica de fora: é a categoria de tudo o que o Chromium não classifica (beacons, pings,
+# algumas requisições de script), e bloquear às cegas pode cortar algo de que o formulário precisa.
+TIPOS_BLOQUEADOS = {"image", "media", "font", "texttrack", "eventsource", "manifest"}
+
+# Hosts liberados (o resto é terceiro: analytics, anúncios, etc.). O formulário é o mesmo para carros,
+# motos e caminhões, então a lista é uma só; hosts_extras de criar_contexto acrescenta outros
+HOSTS_PERMITIDOS = ("veiculos.fipe.org.br", "fipe.org.br", "code.jquery.com", "ajax.googleapis.com")
+
+
+def _host_permitido(host, permitidos):
+    return any(host == h or host.endswith("." + h) for h in permitidos)
+
+
+# Bytes transferidos, requisições bloqueadas e tempo de página pronta por navegação
+# Identificador estável de uma página para as métricas: id(page) pode ser reaproveitado por uma página nova
+# depois que o pool recicla a antiga, misturando os bytes das duas
+_sequencia_paginas = itertools.count(1)
+
+
+def _id_pagina(page):
+    identificador = getattr(page, "_id_metricas", None)
+    if identificador is None:
+        identificador = next(_sequencia_paginas)
+        page._id_metricas = identificador
+    return identificador
+
+
+class MetricasRede:
+    def __init__(self):
+        self.bytes_total = 0
+        self.requisicoes = 0
+        self.bloqueadas = 0
+        self.bytes_por_pagina = {}
+        self.navegacoes = []
+
+    async def registrar_requisicao(self, request):
+        try:
+            tamanhos = await request.sizes()
+        except Exception:
+            return
+        total = tamanhos.get("responseBodySize", 0) + tamanhos.get("responseHeadersSize", 0)
+        self.bytes_total += total
+        self.requisicoes += 1
+        try:
+            pagina = _id_pagina(request.frame.page)
+        except Exception:
+            return
+        self.bytes_por_pagina[pagina] = self.bytes_por_pagina.get(pagina, 0) + total
+
+    def logar(self):
+        logging.info(
+            f"[REDE] {self.requisicoes} requisições, {self.bytes_total / 1024 / 1024:.1f} MB transferidos, "
+            f"{self.bloqueadas} bloqueadas"
+        )
+        if self.navegacoes:
+            tempos = [n["segundos"] for n in self.navegacoes]
+            kbytes = [n["bytes"] / 1024 for n in self.navegacoes]
+            logging.info(
+                f"[REDE] {len(self.navegacoes)} navegações: pronta em média {sum(tempos) / len(tempos):.2f}s "
+                f"(máx {max(tempos):.2f}s), {sum(kbytes) / len(kbytes):.0f} KB por navegação"
+            )
+
+
+metricas_rede = MetricasRede()
+
+
+# Cria um contexto que aborta recursos não essenciais e hosts de terceiros.
+# bloquear_css=True gera um perfil ainda mais enxuto, para quem não depende de visibilidade (ex.: captura XHR).
+async def criar_contexto(browser, metricas=None, bloquear_css=False, hosts_extras=(), **kwargs):
+    metricas = metricas or metricas_rede
+    tipos_bloqueados = TIPOS_BLOQUEADOS | ({"stylesheet"} if bloquear_css else set())
+    permitidos = HOSTS_PERMITIDOS + tuple(hosts_extras)
+
+    context = await browser.new_context(**kwargs)
+
+    async def rotear(route):
+        request = route.request
+        host = urlparse(request.url).hostname or ""
+        if request.resource_type in tipos_bloqueados or not _host_permitido(host, permitidos):
+            metricas.bloqueadas += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", rotear)
+    context.on("requestfinished", metricas.registrar_requisicao)
+    return context
+
+
+# page.goto medindo tempo até a página ficar pronta e quantos bytes ela puxou
+async def navegar(page, url=URL_FIPE, seletor_pronto=None, timeout=120000, metricas=None):
+    metricas = metricas or metricas_rede
+    bytes_antes = metricas.bytes_por_pagina.get(_id_pagina(page), 0)
+    await adquirir("navegacao")
+    inicio = time.perf_counter()
+
+    await page.goto(url, timeout=timeout)
+    if seletor_pronto:
+        await page.wait_for_selector(seletor_pronto, timeout=timeout)
+
+    segundos = time.perf_counter() - inicio
+    bytes_navegacao = metricas.bytes_por_pagina.get(_id_pagina(page), 0) - bytes_antes
+    metricas.navegacoes.append({"url": url, "segundos": segundos, "bytes": bytes_navegacao})
+    logging.info(f"[REDE] Página pronta em {segundos:.2f}s ({bytes_navegacao / 1024:.0f} KB)")
+    return segundos
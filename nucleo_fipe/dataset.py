@@ -0,0 +1,125 @@
+import os
+import re
+import glob
+import logging
+
+import pandas as pd
+
+from nucleo_fipe.api import ANO_ZERO_KM
+
+# Dataset Parquet particionado (hive) com todos os tipos e meses: dataset_fipe/tipo=carro/mes=2025-07/part-*.parquet.
+# Esquema fixo e tipado (preço numérico, ano inteiro, data de referência), row groups ordenados por código FIPE
+# com estatísticas, então uma carga mensal ou uma consulta histórica lê só as partições e row groups que precisa.
+# pyarrow é dependência opcional: sem ele o Excel continua sendo gerado e o dataset é pulado com aviso.
+PASTA_DATASET = "dataset_fipe"
+
+LINHAS_POR_GRUPO = 100000
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+# Colunas do registro ("dados") e colunas derivadas, na ordem do arquivo
+COLUNAS = [
+    ("MarcaSelecionada", "string"),
+    ("ModeloSelecionado", "string"),
+    ("AnoSelecionado", "string"),
+    ("Ano", "int32"),
+    ("Combustivel", "string"),
+    ("CodigoFipe", "string"),
+    ("PrecoMedio", "float64"),
+    ("Mes Referencia", "string"),
+    ("DataReferencia", "date32"),
+    ("origem", "string"),
+]
+
+PARTICOES = [("tipo", "string"), ("mes", "string")]
+
+
+# "julho de 2025", "julho/2025 " -> "2025-07"; None se não reconhecer
+def mes_particao(texto):
+    achado = re.search(r"([a-zç]+)\s*(?:de|/)\s*(\d{4})", str(texto or "").strip().lower())
+    if not achado or achado.group(1) not in MESES:
+        return None
+    return f"{achado.group(2)}-{MESES[achado.group(1)]:02d}"
+
+
+def _esquema(campos):
+    import pyarrow as pa
+
+    tipos = {"string": pa.string(), "int32": pa.int32(), "float64": pa.float64(), "date32": pa.date32()}
+    return pa.schema([(nome, tipos[tipo]) for nome, tipo in campos])
+
+
+# Converte os registros (tudo texto) para as colunas tipadas do esquema.
+# AnoSelecionado "2020 Gasolina" vira Ano 2020 e Combustivel "Gasolina"; zero km ("Zero KM Gasolina")
+# vira Ano 32000, o mesmo código que o site usa, e Combustivel "Gasolina"
+def _preparar(df, tipo, origem):
+    df = df.copy()
+    for nome, _ in COLUNAS:
+        if nome not in df.columns:
+            df[nome] = None
+    ano_texto = df["AnoSelecionado"].fillna("").astype(str).str.strip()
+    ano_texto = ano_texto.str.replace(r"(?i)^zero\s*km\b", str(ANO_ZERO_KM), regex=True).str.strip()
+    partes = ano_texto.str.split(" ", n=1, expand=True).reindex(columns=[0, 1])
+    df["Ano"] = pd.to_numeric(partes[0], errors="coerce").astype("Int32")
+    df["Combustivel"] = partes[1].where(partes[1].notna() & (partes[1] != ""), None)
+    df["PrecoMedio"] = pd.to_numeric(df["PrecoMedio"], errors="coerce")
+    df["mes"] = df["Mes Referencia"].map(mes_particao).fillna("sem-mes")
+    df["DataReferencia"] = pd.to_datetime(df["mes"] + "-01", format="%Y-%m-%d", errors="coerce").dt.date
+    df["origem"] = origem
+    df["tipo"] = tipo
+    return df.sort_values(["mes", "CodigoFipe", "Ano"], na_position="last")
+
+
+# Grava (ou regrava) as partições de um tipo com os registros consolidados. origem ("filtros" ou "codigo")
+# entra no nome dos arquivos: regravar os meses de uma origem troca só os arquivos dela na partição
+def gravar_dataset(df, tipo, origem, raiz=PASTA_DATASET):
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError:
+        logging.warning("[DATASET] pyarrow não instalado, dataset particionado não gerado")
+        return None
+    if df.empty:
+        return None
+
+    df = _preparar(df, tipo, origem)
+    esquema = _esquema(COLUNAS + PARTICOES)
+    tabela = pa.Table.from_pandas(df[[nome for nome, _ in COLUNAS + PARTICOES]], schema=esquema, preserve_index=False)
+
+    meses = sorted(df["mes"].unique())
+    for mes in meses:
+        for antigo in glob.glob(os.path.join(raiz, f"tipo={tipo}", f"mes={mes}", f"part-{origem}-*.parquet")):
+            os.remove(antigo)
+
+    ds.write_dataset(
+        tabela,
+        raiz,
+        format="parquet",
+        partitioning=ds.partitioning(_esquema(PARTICOES), flavor="hive"),
+        basename_template=f"part-{origem}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_options=ds.ParquetFileFormat().make_write_options(compression="zstd", write_statistics=True),
+        max_rows_per_group=LINHAS_POR_GRUPO,
+    )
+    logging.info(f"[DATASET] {len(df)} registros de {tipo} ({origem}) em {len(meses)} partições de {raiz}")
+    return meses
+
+
+# Lê só as partições pedidas (tipos e meses "AAAA-MM") e as colunas pedidas; filtro é uma expressão
+# pyarrow extra aplicada com as estatísticas dos row groups, ex.: ds.field("CodigoFipe") == "001004-9"
+def ler_dataset(tipos=None, meses=None, colunas=None, filtro=None, raiz=PASTA_DATASET):
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(raiz, format="parquet", partitioning=ds.partitioning(_esquema(PARTICOES), flavor="hive"))
+    condicoes = [c for c in (
+        ds.field("tipo").isin(list(tipos)) if tipos else None,
+        ds.field("mes").isin(list(meses)) if meses else None,
+        filtro,
+    ) if c is not None]
+    expressao = None
+    for condicao in condicoes:
+        expressao = condicao if expressao is None else expressao & condicao
+    return dataset.to_table(columns=colunas, filter=expressao).to_pandas()
@@ -0,0 +1,137 @@
+import time
+import random
+import asyncio
+import logging
+from collections import defaultdict
+
+# Atrasos mínimos de cortesia com o site (segundos), ajustáveis por configurar_cortesia.
+# ATRASO_MINIMO_ESPERA vale para toda espera por estado; PAUSA_CORTESIA é o intervalo
+# sorteado usado por pausa_cortesia entre consultas (substitui pausa_curta) e PAUSA_CORTESIA_LENTA
+# o da pausa longa anti-bloqueio entre marcas/lotes (substitui pausa_lenta, que esperava 8-12s).
+ATRASO_MINIMO_ESPERA = 0.0
+PAUSA_CORTESIA = (1.0, 2.0)
+PAUSA_CORTESIA_LENTA = (8.0, 12.0)
+
+
+def configurar_cortesia(minimo_espera=None, pausa=None, pausa_lenta=None):
+    global ATRASO_MINIMO_ESPERA, PAUSA_CORTESIA, PAUSA_CORTESIA_LENTA
+    if minimo_espera is not None:
+        ATRASO_MINIMO_ESPERA = minimo_espera
+    if pausa is not None:
+        PAUSA_CORTESIA = pausa
+    if pausa_lenta is not None:
+        PAUSA_CORTESIA_LENTA = pausa_lenta
+
+
+# Acumula, por ponto de espera (nome da chamada no scraper), o tempo realmente esperado e o que o sleep fixo antigo gastaria
+class RelatorioEsperas:
+    def __init__(self):
+        self.pontos = defaultdict(lambda: {"chamadas": 0, "esperado": 0.0, "antigo": 0.0})
+
+    def registrar(self, ponto, esperado, antigo):
+        dados = self.pontos[ponto]
+        dados["chamadas"] += 1
+        dados["esperado"] += esperado
+        dados["antigo"] += antigo
+
+    def economia_total(self):
+        return sum(d["antigo"] - d["esperado"] for d in self.pontos.values())
+
+    def logar(self):
+        if not self.pontos:
+            return
+        logging.info("[ESPERAS] Tempo esperado x sleep fixo antigo por ponto:")
+        for ponto, d in sorted(self.pontos.items(), key=lambda kv: kv[1]["antigo"] - kv[1]["esperado"], reverse=True):
+            logging.info(
+                f"[ESPERAS] {ponto}: {d['chamadas']} chamadas, esperado {d['esperado']:.1f}s, "
+                f"antigo {d['antigo']:.1f}s, economizado {d['antigo'] - d['esperado']:.1f}s"
+            )
+        logging.info(f"[ESPERAS] Total economizado: {self.economia_total():.1f}s")
+
+
+relatorio_esperas = RelatorioEsperas()
+
+
+async def _concluir(ponto, inicio, sleep_antigo):
+    decorrido = time.perf_counter() - inicio
+    falta = ATRASO_MINIMO_ESPERA - decorrido
+    if falta > 0:
+        await asyncio.sleep(falta)
+        decorrido += falta
+    relatorio_esperas.registrar(ponto, decorrido, sleep_antigo)
+    return decorrido
+
+
+# Lista do chosen populada, <select> por trás dele com alguma opção real e nenhum AJAX do site pendente
+async def esperar_opcoes_carregadas(page, container_id, sleep_antigo=0.0, timeout=20000, ponto="opcoes_carregadas"):
+    inicio = time.perf_counter()
+    await page.wait_for_function(
+        """(id) => {
+            const lis = document.querySelectorAll(`div.chosen-container#${id} ul.chosen-results > li`);
+            const select = document.getElementById(id.replace(/_chosen$/, ''));
+            if (select && !Array.from(select.options).some(o => o.value !== '')) return false;
+            return lis.length > 0 && (!window.jQuery || window.jQuery.active === 0);
+        }""",
+        arg=container_id,
+        timeout=timeout
+    )
+    return await _concluir(ponto, inicio, sleep_antigo)
+
+
+# Texto do chosen saiu do "Selecione..." (e contém o texto esperado, se informado)
+async def esperar_selecao_confirmada(page, container_id, texto=None, sleep_antigo=0.0, timeout=10000, ponto="selecao_confirmada"):
+    inicio = time.perf_counter()
+    await page.wait_for_function(
+        """([id, texto]) => {
+            const span = document.querySelector(`div.chosen-container#${id} a span`);
+            if (!span) return false;
+            const atual = span.textContent.trim().toLowerCase();
+            if (!atual || atual.includes('selecione')) return false;
+            return !texto || atual.includes(texto.trim().toLowerCase());
+        }""",
+        arg=[container_id, texto],
+        timeout=timeout
+    )
+    return await _concluir(ponto, inicio, sleep_antigo)
+
+
+async def esperar_resultado_visivel(page, seletor_resultado, sleep_antigo=0.0, timeout=50000, ponto="resultado_visivel"):
+    inicio = time.perf_counter()
+    await page.wait_for_selector(seletor_resultado, state='visible', timeout=timeout)
+    return await _concluir(ponto, inicio, sleep_antigo)
+
+
+# Depois do "Limpar Pesquisa" o dropdown de marca volta para "Selecione..."
+async def esperar_formulario_resetado(page, container_marca_id, sleep_antigo=0.0, timeout=10000, ponto="formulario_resetado"):
+    inicio = time.perf_counter()
+    await page.wait_for_function(
+        """(id) => {
+            const span = document.querySelector(`#${id} a span`);
+            return span && span.textContent.toLowerCase().includes('selecione');
+        }""",
+        arg=container_marca_id,
+        timeout=timeout
+    )
+    return await _concluir(ponto, inicio, sleep_antigo)
+
+
+# Campo de texto (ex.: código FIPE) voltou a ficar vazio, sinal de que o "Limpar Pesquisa" terminou
+async def esperar_campo_vazio(page, seletor, sleep_antigo=0.0, timeout=10000, ponto="campo_vazio"):
+    inicio = time.perf_counter()
+    await page.wait_for_function(
+        """(seletor) => {
+            const input = document.querySelector(seletor);
+            return input && input.value.trim() === '';
+        }""",
+        arg=seletor,
+        timeout=timeout
+    )
+    return await _concluir(ponto, inicio, sleep_antigo)
+
+
+# Pausa de cortesia entre consultas (anti-bloqueio), sorteada em PAUSA_CORTESIA (lenta=True: PAUSA_CORTESIA_LENTA)
+async def pausa_cortesia(ponto="cortesia", sleep_antigo=0.0, lenta=False):
+    t = random.uniform(*(PAUSA_CORTESIA_LENTA if lenta else PAUSA_CORTESIA))
+    await asyncio.sleep(t)
+    relatorio_esperas.registrar(ponto, t, sleep_antigo)
+    return t
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Orçamento de requisições combinado com o site, somando todos os workers, tipos e processos da máquina.
+# "pesquisa" cobre cada consulta de preço feita pelo navegador; "navegacao" cada carregamento de página;
+# "api" cada chamada do ClienteFipeApi (listagens de mês, marca, modelo e ano e consultas de preço).
+# A coleta via API tem balde próprio para não dividir o orçamento de 1/s do navegador; ajuste com
+# configurar_limite("api", taxa=..., rajada=...). (taxa por segundo, rajada)
+LIMITES_PADRAO = {
+    "pesquisa": (1.0, 3),
+    "navegacao": (0.2, 2),
+    "api": (4.0, 8),
+}
+
+# Estado dos baldes fica num arquivo por balde na pasta temporária: todos os processos na máquina
+# (Scraping_carros.py e CodigoFipe_Motos.py rodando juntos, por exemplo) gastam do mesmo orçamento
+PASTA_BALDES = tempfile.gettempdir()
+
+
+def _travar(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _destravar(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Balde de fichas (token bucket): enche "taxa" fichas por segundo até "rajada"; cada requisição gasta uma.
+# Com compartilhar=True o saldo é lido e gravado no arquivo do balde sob trava exclusiva
+class BaldeFichas:
+    def __init__(self, nome, taxa, rajada, compartilhar=True, pasta=None):
+        self.nome = nome
+        self.taxa = taxa
+        self.rajada = rajada
+        self.caminho = os.path.join(pasta or PASTA_BALDES, f"fipe_balde_{nome}.json") if compartilhar else None
+        self.fichas = float(rajada)
+        self.atualizado = time.time()
+        self.adquiridas = 0
+        self.esperas = 0
+        self.tempo_espera = 0.0
+        self.maior_espera = 0.0
+
+    def _encher(self, fichas, atualizado, agora):
+        return min(self.rajada, fichas + (agora - atualizado) * self.taxa)
+
+    # Tenta gastar uma ficha; devolve 0 se conseguiu ou quantos segundos faltam para a próxima
+    def _tentar_local(self):
+        agora = time.time()
+        self.fichas = self._encher(self.fichas, self.atualizado, agora)
+        self.atualizado = agora
+        if self.fichas >= 1:
+            self.fichas -= 1
+            return 0.0
+        return (1 - self.fichas) / self.taxa
+
+    def _tentar_arquivo(self):
+        with open(self.caminho, "a+", encoding="utf-8") as f:
+            _travar(f)
+            try:
+                f.seek(0)
+                try:
+                    estado = json.loads(f.read() or "{}")
+                except ValueError:
+                    estado = {}
+                agora = time.time()
+                fichas = self._encher(estado.get("fichas", self.rajada), estado.get("atualizado", agora), agora)
+                espera = 0.0
+                if fichas >= 1:
+                    fichas -= 1
+                else:
+                    espera = (1 - fichas) / self.taxa
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps({"fichas": fichas, "atualizado": agora}))
+                f.flush()
+            finally:
+                _destravar(f)
+        return espera
+
+    def _tentar(self):
+        if self.caminho:
+            try:
+                return self._tentar_arquivo()
+            except OSError as e:
+                logging.warning(f"[LIMITE] Arquivo do balde {self.nome} indisponível ({e}); usando saldo local")
+                self.caminho = None
+        return self._tentar_local()
+
+    async def adquirir(self):
+        inicio = time.perf_counter()
+        while True:
+            espera = self._tentar()
+            if espera <= 0:
+                break
+            await asyncio.sleep(espera)
+        esperado = time.perf_counter() - inicio
+        self.adquiridas += 1
+        if esperado > 0.001:
+            self.esperas += 1
+            self.tempo_espera += esperado
+            self.maior_espera = max(self.maior_espera, esperado)
+        return esperado
+
+    def logar(self):
+        if not self.adquiridas:
+            return
+        media = self.tempo_espera / self.adquiridas
+        logging.info(
+            f"[LIMITE] {self.nome}: {self.adquiridas} fichas ({self.taxa:g}/s, rajada {self.rajada}); "
+            f"{self.esperas} esperaram, total {self.tempo_espera:.0f}s, média {media:.2f}s, máx {self.maior_espera:.1f}s"
+        )
+
+
+baldes = {nome: BaldeFichas(nome, taxa, rajada) for nome, (taxa, rajada) in LIMITES_PADRAO.items()}
+
+
+# Ajusta taxa/rajada de um balde, ex.: configurar_limite("pesquisa", taxa=2.0, rajada=5)
+def configurar_limite(nome, taxa=None, rajada=None, compartilhar=True):
+    balde = baldes.get(nome)
+    taxa = taxa if taxa is not None else (balde.taxa if balde else 1.0)
+    rajada = rajada if rajada is not None else (balde.rajada if balde else 1)
+    baldes[nome] = BaldeFichas(nome, taxa, rajada, compartilhar=compartilhar)
+
+
+async def adquirir(nome):
+    balde = baldes.get(nome)
+    if balde is None:
+        return 0.0
+    return await balde.adquirir()
+
+
+def logar_limites():
+    for balde in baldes.values():
+        balde.logar()
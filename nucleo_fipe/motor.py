@@ -0,0 +1,720 @@
+import os
+import time
+import asyncio
+import logging
+
+import pandas as pd
+from playwright.async_api import async_playwright
+
+from nucleo_fipe.perfis import PERFIS
+from nucleo_fipe.resultado import pesquisar_e_capturar, consultar_valor_direto
+from nucleo_fipe.selecao import ErroSelecao, selecionar_opcao_js, texto_selecionado, formulario_confere, contador_reselecao, opcoes_com_valor
+from nucleo_fipe.esperas import esperar_opcoes_carregadas, esperar_selecao_confirmada, esperar_formulario_resetado, relatorio_esperas
+from nucleo_fipe.contexto import navegar, metricas_rede
+from nucleo_fipe.pool import PoolNavegador
+from nucleo_fipe.agendador import AgendadorTrabalho
+from nucleo_fipe.concorrencia import controle_concorrencia
+from nucleo_fipe.limitador import logar_limites
+from nucleo_fipe.tentativas import politica_padrao, classificar_erro
+from nucleo_fipe.banco_estado import BancoEstado
+from nucleo_fipe.saida import criar_saida, ler_registros, FORMATO_PADRAO
+from nucleo_fipe.persistencia import AtorPersistencia, monitor_laco
+from nucleo_fipe.dataset import gravar_dataset
+from nucleo_fipe.planejamento import (UnidadeTrabalho, carregar_catalogo, carregar_cache_anos, salvar_cache_anos, registrar_anos,
+                                      construir_plano, logar_plano, custo_por_marca, anos_do_cache, media_anos, carregar_arvore,
+                                      salvar_arvore, registrar_marca_arvore, registrar_anos_arvore, marca_sem_mudanca)
+
+# Motor único da pesquisa por filtros (marca > modelo > ano) para carros, motos e caminhões.
+# Os Scraping_*.py só escolhem o perfil; vários tipos podem rodar juntos no mesmo pool de navegador.
+
+# Lê o registro do JSON que o site busca ao clicar em Pesquisar (DOM só como fallback)
+CAPTURAR_XHR = True
+
+# Seleciona direto no <select> via JS em vez de andar com as setas (custo constante)
+SELECAO_JS = True
+
+# Depois de uma pesquisa troca só o ano, mantendo marca e modelo; volta ao reset completo se o formulário mudou.
+# Depende da captura do XHR: pelo DOM a tabela do ano anterior ainda estaria visível
+REAPROVEITAR_SELECAO = CAPTURAR_XHR
+
+# Timeouts curtos por tentativa: a falha aparece cedo e a política de retentativa decide o que fazer,
+# em vez de cada erro custar 50–120s de espera
+TIMEOUT_ETAPA = 15000
+TIMEOUT_PESQUISA = 20000
+TIMEOUT_NAVEGACAO = 45000
+
+
+# Progresso de um tipo de veículo no banco de estado (unidades concluídas, falhas, reservas e meses)
+# e o cache de anos. As chaves seguem UnidadeTrabalho.chave: (mes, tipo, marca, modelo, ano).
+# Banco, segmentos de registros e cache de anos só são tocados pelo ator de persistência: leituras
+# esperam a resposta (chamar), escritas só enfileiram (enviar) e o laço segue com os outros workers
+class EstadoColeta:
+    def __init__(self, perfil, ator, banco, formato_saida=FORMATO_PADRAO, delta=False):
+        self.perfil = perfil
+        self.ator = ator
+        self.banco = banco
+        self.formato_saida = formato_saida
+        self.saida = None
+        self.anos_cache = carregar_cache_anos(perfil.tipo)
+        # Árvore com os códigos do site; no modo delta, (mes, marca) cuja sonda bateu com a árvore
+        # tem os preços consultados direto no endpoint, sem abrir modelo e ano no formulário
+        self.arvore = carregar_arvore(perfil.tipo)
+        self.delta = delta
+        self.marcas_conhecidas = set()
+        self.codigos_mes = {}
+        self.codigos_marca = {}
+        self.delta_contagem = {"marcas_reaproveitadas": 0, "marcas_redescobertas": 0, "consultas_diretas": 0, "modelos_redescobertos": 0}
+        # (mes, marca) com algum modelo que falhou nesta execução: nem a marca nem o mês entram como concluídos
+        self.marcas_incompletas = set()
+
+    # Registros vão para segmentos em disco; descarregados antes de cada commit do banco
+    async def abrir(self):
+        self.saida = await self.ator.chamar(criar_saida, self.perfil.pasta_registros, self.formato_saida, tipo=self.perfil.tipo)
+        await self.ator.chamar(self.banco.ao_confirmar, self.saida.descarregar)
+        await self.ator.chamar(self.banco.importar_legado, self.perfil.tipo, self.perfil.arquivo_diario, self.perfil.arquivo_meses)
+        return self
+
+    def _chave(self, mes, marca, modelo=None, ano=None):
+        return (mes, self.perfil.tipo, marca, modelo, ano)
+
+    async def mes_feito(self, mes):
+        return await self.ator.chamar(self.banco.mes_concluido, self.perfil.tipo, mes)
+
+    async def concluir_mes(self, mes):
+        await self.ator.enviar(self.banco.concluir_mes, self.perfil.tipo, mes)
+
+    async def marca_feita(self, mes, marca):
+        return await self.ator.chamar(self.banco.concluida, self._chave(mes, marca))
+
+    async def ano_feito(self, mes, marca, modelo, ano):
+        return await self.ator.chamar(self.banco.concluida, self._chave(mes, marca, modelo, ano))
+
+    async def modelo_feito(self, mes, marca, modelo):
+        return await self.ator.chamar(self.banco.concluida, self._chave(mes, marca, modelo))
+
+    async def modelos_feitos(self, mes, marca):
+        return await self.ator.chamar(self.banco.modelos_concluidos, self.perfil.tipo, mes, marca)
+
+    async def feitas(self, meses):
+        return await self.ator.chamar(self.banco.concluidas, self.perfil.tipo, meses)
+
+    # O registro entra na fila antes da conclusão do ano: o ator grava os dois nessa ordem
+    async def gravar_ano(self, mes, marca, modelo, ano, dados, duracao=None):
+        await self.ator.enviar(self.saida.gravar, dados)
+        await self.ator.enviar(self.banco.concluir, self._chave(mes, marca, modelo, ano), duracao)
+
+    async def falhar_ano(self, mes, marca, modelo, ano, erro):
+        await self.ator.enviar(self.banco.registrar_falha, self._chave(mes, marca, modelo, ano), classificar_erro(erro), erro)
+
+    async def marcar_modelo(self, mes, marca, modelo):
+        await self.ator.enviar(self.banco.concluir, self._chave(mes, marca, modelo))
+
+    async def marcar_marca(self, mes, marca):
+        await self.ator.enviar(self.banco.concluir, self._chave(mes, marca))
+
+    # Outro processo coletando o mesmo tipo não pega o modelo enquanto a reserva valer
+    async def reservar_modelo(self, mes, marca, modelo):
+        return await self.ator.chamar(self.banco.reservar, self._chave(mes, marca, modelo))
+
+    async def liberar_modelo(self, mes, marca, modelo):
+        await self.ator.enviar(self.banco.liberar, self._chave(mes, marca, modelo))
+
+    # O ator grava uma cópia: o laço continua atualizando o cache enquanto o JSON é escrito
+    async def registrar_anos(self, nome_marca, nome_modelo, anos):
+        if registrar_anos(self.anos_cache, nome_marca, nome_modelo, anos):
+            await self.ator.enviar(salvar_cache_anos, self.perfil.tipo, dict(self.anos_cache))
+
+    async def fechar(self):
+        if self.saida is not None:
+            await self.ator.chamar(self.saida.fechar)
+        await self.ator.chamar(salvar_arvore, self.perfil.tipo, self.arvore)
+
+    def logar_delta(self):
+        if self.delta:
+            c = self.delta_contagem
+            logging.info(f"[DELTA] {self.perfil.tipo}: {c['marcas_reaproveitadas']} marcas pela árvore, {c['marcas_redescobertas']} redescobertas; "
+                         f"{c['consultas_diretas']} preços direto no endpoint, {c['modelos_redescobertos']} modelos voltaram ao formulário")
+
+
+# Abre o dropdown/Seleção de itens e espera a lista carregar
+async def abrir_dropdown_e_esperar(page, container_id):
+    logging.info(f"Abrindo dropdown: {container_id}")
+    await page.focus(f'div.chosen-container#{container_id} > a')
+    await page.click(f'div.chosen-container#{container_id} > a')
+    await esperar_opcoes_carregadas(page, container_id, sleep_antigo=2, ponto="abrir_dropdown")
+
+
+async def listar_opcoes(page, container_id):
+    await abrir_dropdown_e_esperar(page, container_id)
+    itens = await page.query_selector_all(f'div.chosen-container#{container_id} ul.chosen-results > li')
+    return [(await i.text_content()).strip() for i in itens]
+
+
+# Seleciona o item pelo index dele
+async def selecionar_item_por_index(page, perfil, container_id, index, use_arrow=False, use_js=None):
+    use_js = SELECAO_JS if use_js is None else use_js
+    if use_js:
+        await selecionar_opcao_js(page, container_id, indice=index, dependente=perfil.dependentes.get(container_id))
+        return
+
+    logging.info(f"Selecionando item {index+1} no dropdown {container_id}")
+    await abrir_dropdown_e_esperar(page, container_id)
+    await page.focus(f'div.chosen-container#{container_id} > a')
+    await asyncio.sleep(0.5)
+
+    if use_arrow:
+        # Fecha qualquer dropdown aberto
+        await page.keyboard.press("Escape")
+        await asyncio.sleep(0.6)
+        await page.keyboard.press("Escape")
+        await asyncio.sleep(0.6)
+
+        # Reabre o dropdown para navegação ao índice desejado
+        await abrir_dropdown_e_esperar(page, container_id)
+        await page.focus(f'div.chosen-container#{container_id} > a')
+        await asyncio.sleep(0.3)
+
+        ultimo_texto = ""
+        tentativas = 0
+        max_tentativas = 30
+
+        while tentativas < max_tentativas:
+            itens = await page.query_selector_all(f'div.chosen-container#{container_id} ul.chosen-results > li.highlighted')
+            if itens:
+                texto_atual = await itens[0].text_content()
+                texto_atual = texto_atual.strip() if texto_atual else ""
+                if texto_atual == ultimo_texto:
+                    break
+                ultimo_texto = texto_atual
+
+            await page.keyboard.press("ArrowUp")
+            await asyncio.sleep(0.05)
+            tentativas += 1
+
+        # Navega até o indice que eu quero
+        for _ in range(index):
+            await page.keyboard.press("ArrowDown")
+            await asyncio.sleep(0.3)
+        await page.keyboard.press("Enter")
+        await esperar_selecao_confirmada(page, container_id, sleep_antigo=1, ponto="selecionar_item")
+    else:
+        items = await page.query_selector_all(f'div.chosen-container#{container_id} ul.chosen-results > li')
+        if not items:
+            logging.warning(f"Dropdown {container_id} não carregou itens!")
+            return
+        if index >= len(items):
+            logging.warning(f"Index {index} fora do range no dropdown {container_id} (total: {len(items)})")
+            return
+        await items[index].scroll_into_view_if_needed()
+        await asyncio.sleep(0.3)
+        item_text = await items[index].text_content()
+        logging.info(f"Clicando no item '{item_text.strip()}'")
+        await items[index].click()
+        await esperar_selecao_confirmada(page, container_id, texto=item_text.strip(), sleep_antigo=1, ponto="selecionar_item")
+
+
+# Clica no botão para limpar a pesquisa após pegar os dados da tabela
+async def limpar_pesquisa(page, perfil):
+    try:
+        await page.wait_for_selector(perfil.botao_limpar, state='visible', timeout=5000)
+        limpar_link = page.locator(perfil.botao_limpar)
+        await limpar_link.scroll_into_view_if_needed()
+        await limpar_link.click()
+        logging.info(">>> Pesquisa limpa com sucesso.")
+
+        await esperar_formulario_resetado(page, perfil.container("Marca"), sleep_antigo=2, ponto="limpar_pesquisa")
+        logging.info(">>> Confirmação visual: dropdown de Marca resetado.")
+    except Exception as e:
+        logging.warning(f"[ERRO ao tentar limpar pesquisa]: {e}")
+
+
+# Navega, abre a aba do tipo e seleciona o mês de referência (o mais recente se nome_mes=None).
+# Retorna False se o mês não existe no site
+# Se a página já está na aba do tipo (LPT mistura meses no mesmo worker), só troca o mês, sem navegar de novo
+async def preparar_pagina(page, perfil, nome_mes=None):
+    container_mes = perfil.container("TabelaReferencia")
+    if page.url == "about:blank" or not await _na_aba(page, container_mes):
+        await navegar(page, timeout=TIMEOUT_NAVEGACAO)
+
+        await page.wait_for_selector(f'li:has-text("{perfil.aba}")', timeout=TIMEOUT_ETAPA)
+        await page.click(f'li:has-text("{perfil.aba}")')
+
+    nomes_meses = await listar_opcoes(page, container_mes)
+
+    if nome_mes is None:
+        indice_mes = 0
+    elif nome_mes in nomes_meses:
+        indice_mes = nomes_meses.index(nome_mes)
+    else:
+        logging.error(f"[ERRO] Mês '{nome_mes}' não encontrado no dropdown de Tabela de Referência ({perfil.tipo})!")
+        return False
+
+    await selecionar_item_por_index(page, perfil, container_mes, indice_mes, use_arrow=True)
+    return True
+
+
+# Dropdown de mês do tipo visível = página ainda está na aba certa
+async def _na_aba(page, container_mes):
+    try:
+        return await page.is_visible(f'div.chosen-container#{container_mes}')
+    except Exception:
+        return False
+
+
+# Página já está na aba do tipo com o mês certo selecionado (checagem sem abrir dropdown)
+async def pagina_pronta(page, perfil, nome_mes):
+    if page.url == "about:blank":
+        return False
+    try:
+        return await texto_selecionado(page, perfil.container("TabelaReferencia")) == nome_mes
+    except Exception:
+        return False
+
+
+async def obter_modelos_disponiveis(page, perfil):
+    await abrir_dropdown_e_esperar(page, perfil.container("AnoModelo"))
+    modelos = await page.query_selector_all(f'div.chosen-container#{perfil.container("AnoModelo")} ul.chosen-results > li')
+    modelos_nomes = [(await m.text_content()).strip() for m in modelos]
+    return modelos, modelos_nomes
+
+
+# Seleciona pelo texto da opção: não depende da ordem da lista, então vários workers podem
+# pegar modelos diferentes da mesma marca sem combinar índices
+async def selecionar_item_por_nome(page, perfil, container_id, nome, use_js=None):
+    use_js = SELECAO_JS if use_js is None else use_js
+    if use_js:
+        await selecionar_opcao_js(page, container_id, texto=nome, dependente=perfil.dependentes.get(container_id))
+        return
+
+    nomes = await listar_opcoes(page, container_id)
+    alvo = nome.strip().lower()
+    indice = next((i for i, n in enumerate(nomes) if n.strip().lower() == alvo), None)
+    if indice is None:
+        raise ErroSelecao(f"'{nome}' não encontrado no dropdown {container_id}")
+    await selecionar_item_por_index(page, perfil, container_id, indice, use_arrow=True, use_js=False)
+
+
+# Reseleciona marca e modelo depois de limpar a pesquisa (ou quando a seleção do modelo falhou)
+async def reselecionar_marca_modelo(page, perfil, nome_marca, nome_modelo):
+    await selecionar_item_por_nome(page, perfil, perfil.container("Marca"), nome_marca)
+    await page.keyboard.press("Escape")
+    await page.wait_for_selector(perfil.botao_pesquisar, state='visible', timeout=TIMEOUT_ETAPA)
+
+    await selecionar_item_por_nome(page, perfil, perfil.container("AnoModelo"), nome_modelo)
+    await page.keyboard.press("Escape")
+    await page.wait_for_selector(perfil.botao_pesquisar, state='visible', timeout=TIMEOUT_ETAPA)
+
+
+# Página emprestada do pool já vem na aba e no mês certos; só prepara se não vier
+async def garantir_mes(page, perfil, nome_mes):
+    if await pagina_pronta(page, perfil, nome_mes):
+        return True
+    return await preparar_pagina(page, perfil, nome_mes)
+
+
+# Abre a marca e devolve os modelos que ainda faltam (limitados a max_modelos), sem consultar nenhum preço
+async def listar_modelos_pendentes(page, perfil, estado, unidade, max_modelos):
+    if not await garantir_mes(page, perfil, unidade.mes):
+        return None
+
+    if not await formulario_confere(page, {perfil.container("Marca"): unidade.marca}):
+        await limpar_pesquisa(page, perfil)
+    await selecionar_item_por_nome(page, perfil, perfil.container("Marca"), unidade.marca)
+    _, modelos_nomes = await obter_modelos_disponiveis(page, perfil)
+    await page.keyboard.press("Escape")
+
+    # Sonda da marca: nomes e códigos dos modelos direto do <select>. No modo delta, marca igual à árvore
+    # do mês anterior não passa de novo pela descoberta de anos
+    opcoes = await opcoes_com_valor(page, perfil.container("AnoModelo"))
+    if estado.delta:
+        if marca_sem_mudanca(estado.arvore, unidade.marca, [nome for nome, _ in opcoes]):
+            estado.marcas_conhecidas.add((unidade.mes, unidade.marca))
+            estado.delta_contagem["marcas_reaproveitadas"] += 1
+        else:
+            estado.delta_contagem["marcas_redescobertas"] += 1
+            logging.info(f"[DELTA] {unidade.marca} ({perfil.tipo}): modelos mudaram desde a última árvore, descobrindo pelo formulário")
+    registrar_marca_arvore(estado.arvore, unidade.marca, estado.codigos_marca.get(unidade.marca), opcoes)
+
+    if max_modelos is not None:
+        modelos_nomes = modelos_nomes[:max_modelos]
+    pendentes = [m for m in modelos_nomes if not await estado.modelo_feito(unidade.mes, unidade.marca, m)]
+    logging.info(f"[MARCA] {unidade.marca} ({perfil.tipo}, {unidade.mes}): {len(modelos_nomes)} modelos, {len(pendentes)} pendentes")
+    return pendentes
+
+
+# Modo delta: consulta cada ano conhecido do modelo direto no endpoint com os códigos da árvore.
+# Devolve None se falta algum código ou o site não reconhece mais uma combinação (ano retirado, código
+# trocado): o chamador segue pelo formulário, que descobre os anos de novo e pula os já gravados
+async def processar_modelo_direto(page, perfil, estado, unidade, max_anos):
+    marca = estado.arvore.get(unidade.marca, {})
+    modelo = marca.get("modelos", {}).get(unidade.modelo, {})
+    codigo_tabela = estado.codigos_mes.get(unidade.mes)
+    if not (codigo_tabela and marca.get("codigo") and modelo.get("codigo") and modelo.get("anos")):
+        return None
+    anos = modelo["anos"] if max_anos is None else modelo["anos"][:max_anos]
+
+    falhas = 0
+    for nome_ano, valor_ano in anos:
+        if await estado.ano_feito(unidade.mes, unidade.marca, unidade.modelo, nome_ano):
+            continue
+        inicio = time.perf_counter()
+        try:
+            dados = await politica_padrao.executar(
+                "pesquisa", consultar_valor_direto, page, perfil.tipo, codigo_tabela, marca["codigo"], modelo["codigo"], valor_ano,
+                timeout=TIMEOUT_PESQUISA
+            )
+        except ErroSelecao as e:
+            logging.info(f"[DELTA] {unidade.marca} {unidade.modelo}: {e}")
+            return None
+        except Exception as e:
+            falhas += 1
+            await estado.falhar_ano(unidade.mes, unidade.marca, unidade.modelo, nome_ano, e)
+            logging.warning(f"[ERRO] Ano {nome_ano} do Modelo [{unidade.modelo}] (direto): {e}")
+            continue
+        estado.delta_contagem["consultas_diretas"] += 1
+        await estado.gravar_ano(unidade.mes, unidade.marca, unidade.modelo, nome_ano, dados, time.perf_counter() - inicio)
+
+    if falhas == 0:
+        await estado.marcar_modelo(unidade.mes, unidade.marca, unidade.modelo)
+        return True
+    logging.warning(f"[INCOMPLETO] {unidade.marca} {unidade.modelo}: {falhas} ano(s) com erro, fica pendente para a próxima execução")
+    return False
+
+
+# Coleta todos os anos de um modelo. Marca e modelo são escolhidos pelo nome, então o modelo pode rodar
+# em qualquer página do pool. Cada ano concluído vai para o diário (retomada exata no meio do modelo);
+# o modelo só é marcado quando todos os anos deram certo
+async def processar_modelo(page, perfil, estado, unidade, max_anos):
+    nome_marca, nome_modelo = unidade.marca, unidade.modelo
+    container_marca = perfil.container("Marca")
+    container_modelo = perfil.container("AnoModelo")
+    container_ano = perfil.container("Ano")
+    logging.info(f"  Modelo ({perfil.tipo}, {unidade.mes}) {nome_marca}: {nome_modelo}")
+
+    if (unidade.mes, nome_marca) in estado.marcas_conhecidas:
+        completo = await processar_modelo_direto(page, perfil, estado, unidade, max_anos)
+        if completo is not None:
+            return completo
+        estado.delta_contagem["modelos_redescobertos"] += 1
+
+    if not await politica_padrao.executar("navegacao", garantir_mes, page, perfil, unidade.mes):
+        return False
+
+    # Antes de nova tentativa: página que caiu ou navegou volta para a aba e o mês da unidade
+    async def recuperar(classe):
+        if classe == "navegacao":
+            await preparar_pagina(page, perfil, unidade.mes)
+
+    # Pesquisa que falhou pode ter deixado a tabela ou o formulário num estado intermediário:
+    # a nova tentativa do ano refaz a seleção completa em vez de reaproveitar marca e modelo
+    refazer_selecao = False
+
+    async def recuperar_pesquisa(classe):
+        nonlocal refazer_selecao
+        refazer_selecao = True
+        await recuperar(classe)
+
+    async def selecionar_modelo():
+        # Mesma marca do modelo anterior nesta página: troca só o modelo
+        if await formulario_confere(page, {container_marca: nome_marca}):
+            contador_reselecao.evitadas += 1
+        else:
+            await limpar_pesquisa(page, perfil)
+            await selecionar_item_por_nome(page, perfil, container_marca, nome_marca)
+        await selecionar_item_por_nome(page, perfil, container_modelo, nome_modelo)
+        await page.wait_for_selector(perfil.botao_pesquisar, state='visible', timeout=TIMEOUT_ETAPA)
+
+        # Verifica se o modelo foi realmente selecionado
+        if not await formulario_confere(page, {container_modelo: nome_modelo}):
+            logging.warning(f"[AVISO] Falha ao selecionar o modelo {nome_modelo}, tentando resetar dropdowns...")
+            await limpar_pesquisa(page, perfil)
+            await reselecionar_marca_modelo(page, perfil, nome_marca, nome_modelo)
+
+        await abrir_dropdown_e_esperar(page, container_ano)
+        anos = await page.query_selector_all(f'div.chosen-container#{container_ano} ul.chosen-results > li')
+        return [(await a.text_content()).strip() for a in anos]
+
+    nomes_anos = await politica_padrao.executar("selecao", selecionar_modelo, recuperar=recuperar)
+    await estado.registrar_anos(nome_marca, nome_modelo, nomes_anos)
+    codigos_modelos = dict(await opcoes_com_valor(page, container_modelo))
+    registrar_anos_arvore(estado.arvore, nome_marca, nome_modelo, codigos_modelos.get(nome_modelo),
+                          await opcoes_com_valor(page, container_ano))
+    max_anos_loop = len(nomes_anos) if max_anos is None else min(max_anos, len(nomes_anos))
+
+    async def consultar_ano(ano_index):
+        nonlocal refazer_selecao
+        # Caminho rápido: a pesquisa anterior (ou a seleção do modelo) deixou marca e modelo selecionados,
+        # só troca o ano. Nova tentativa depois de um erro sempre refaz a seleção
+        nova_tentativa, refazer_selecao = refazer_selecao, False
+        reaproveitar = (REAPROVEITAR_SELECAO or ano_index == 0) and not nova_tentativa and await formulario_confere(page, {
+            container_marca: nome_marca,
+            container_modelo: nome_modelo,
+        })
+
+        if reaproveitar:
+            if ano_index > 0:
+                contador_reselecao.evitadas += 1
+        else:
+            if REAPROVEITAR_SELECAO and ano_index > 0 and not nova_tentativa:
+                contador_reselecao.derivas += 1
+                logging.info("    [DERIVA] Formulário mudou desde a última pesquisa, refazendo seleção completa")
+            await limpar_pesquisa(page, perfil)
+            await page.wait_for_selector(perfil.botao_pesquisar, state='visible', timeout=TIMEOUT_ETAPA)
+            await reselecionar_marca_modelo(page, perfil, nome_marca, nome_modelo)
+
+        nome_ano = nomes_anos[ano_index]
+        logging.info(f"    Ano [{ano_index+1}]: {nome_ano}")
+        await selecionar_item_por_nome(page, perfil, container_ano, nome_ano)
+
+        logging.info("    Realizando busca...")
+        return await pesquisar_e_capturar(
+            page,
+            perfil.botao_pesquisar,
+            perfil.seletor_resultado,
+            perfil.tabela_resultado,
+            interceptar=CAPTURAR_XHR,
+            timeout=TIMEOUT_PESQUISA,
+            dom=not reaproveitar,
+            ano_esperado=nome_ano
+        )
+
+    falhas = 0
+    for ano_index in range(max_anos_loop):
+        if await estado.ano_feito(unidade.mes, nome_marca, nome_modelo, nomes_anos[ano_index]):
+            logging.info(f"    [SKIP] Ano já coletado: {nomes_anos[ano_index]}")
+            continue
+        inicio = time.perf_counter()
+        try:
+            dados = await politica_padrao.executar("pesquisa", consultar_ano, ano_index, recuperar=recuperar_pesquisa)
+        except Exception as e:
+            falhas += 1
+            await estado.falhar_ano(unidade.mes, nome_marca, nome_modelo, nomes_anos[ano_index], e)
+            logging.warning(f"[ERRO] Ano [{ano_index+1}] do Modelo [{nome_modelo}]: {e}")
+            continue
+
+        logging.info(f"    Código Fipe extraído: {dados['CodigoFipe']}")
+        logging.info(f"    Preço Médio extraído: {dados['PrecoMedio']}")
+        await estado.gravar_ano(unidade.mes, nome_marca, nome_modelo, nomes_anos[ano_index], dados, time.perf_counter() - inicio)
+
+    if falhas == 0:
+        await estado.marcar_modelo(unidade.mes, nome_marca, nome_modelo)
+        return True
+    logging.warning(f"[INCOMPLETO] {nome_marca} {nome_modelo}: {falhas} ano(s) com erro, fica pendente para a próxima execução")
+    return False
+
+
+# Contadores de unidades em aberto: (tipo, mes) -> marcas e (tipo, mes, marca) -> modelos.
+# Quando os modelos de uma marca zeram, a marca conta como concluída; quando as marcas zeram, o mês
+# Marca ou mês com alguma falha não entra como concluído no banco e é retomado na próxima execução
+async def _concluir_marca(estado, pendentes, nome_mes, nome_marca, concluida=True):
+    tipo = estado.perfil.tipo
+    pendentes.pop((tipo, nome_mes, nome_marca), None)
+    if concluida and (nome_mes, nome_marca) not in estado.marcas_incompletas:
+        await estado.marcar_marca(nome_mes, nome_marca)
+    else:
+        estado.marcas_incompletas.add((nome_mes, nome_marca))
+    chave = (tipo, nome_mes)
+    pendentes[chave] -= 1
+    if pendentes[chave] == 0:
+        if any(mes == nome_mes for mes, _ in estado.marcas_incompletas):
+            logging.warning(f"[MÊS INCOMPLETO] {tipo}: {nome_mes} tem marcas com falha, fica pendente")
+            return
+        await estado.concluir_mes(nome_mes)
+        logging.info(f"[MÊS CONCLUÍDO] {tipo}: {nome_mes}")
+
+
+async def _concluir_modelo(estado, pendentes, nome_mes, nome_marca, completo):
+    if not completo:
+        estado.marcas_incompletas.add((nome_mes, nome_marca))
+    chave = (estado.perfil.tipo, nome_mes, nome_marca)
+    pendentes[chave] -= 1
+    if pendentes[chave] == 0:
+        logging.info(f"[CONCLUÍDO] Marca {nome_marca} ({estado.perfil.tipo}, {nome_mes}): "
+                     f"{await estado.modelos_feitos(nome_mes, nome_marca)} modelos processados.")
+        await _concluir_marca(estado, pendentes, nome_mes, nome_marca)
+
+
+# Custo de um modelo para o agendador: anos no cache (limitados a max_anos) ou a média de anos
+def _custo_modelo(estado, marca, modelo, max_anos):
+    anos = anos_do_cache(estado.anos_cache, marca, modelo)
+    custo = len(anos) if anos else media_anos(estado.anos_cache)
+    return min(custo, max_anos) if max_anos is not None else custo
+
+
+# Unidade de marca (modelo=None): lista os modelos pendentes e enfileira uma unidade por modelo, que
+# qualquer worker pode pegar. Unidade de modelo: coleta os anos daquele modelo
+async def executar_tarefa(pool, agendador, tarefa, pendentes, max_modelos, max_anos):
+    perfil, estado, unidade = tarefa
+    modelos = None
+    completo = False
+
+    # Modelo reservado por outro processo: não conta como concluído aqui, o dono da reserva marca.
+    # Reserva que falhou (ex.: banco travado por outro processo) também deixa o modelo pendente
+    if unidade.modelo is not None:
+        try:
+            reservado = await estado.reservar_modelo(unidade.mes, unidade.marca, unidade.modelo)
+        except Exception as e:
+            logging.error(f"[RESERVA] Falha ao reservar {unidade.marca} {unidade.modelo} ({unidade.mes}): {e}")
+            reservado = False
+        else:
+            if not reservado:
+                logging.info(f"[RESERVA] {unidade.marca} {unidade.modelo} ({unidade.mes}) está com outro processo, pulando")
+        if not reservado:
+            await _concluir_modelo(estado, pendentes, unidade.mes, unidade.marca, False)
+            return
+
+    try:
+        async with pool.pagina(
+            preparar=lambda page: preparar_pagina(page, perfil, unidade.mes),
+            chave=(perfil.tipo, unidade.mes)
+        ) as page:
+            if unidade.modelo is None:
+                modelos = await politica_padrao.executar(
+                    "marca", listar_modelos_pendentes, page, perfil, estado, unidade, max_modelos,
+                    recuperar=lambda classe: preparar_pagina(page, perfil, unidade.mes)
+                )
+            else:
+                completo = await processar_modelo(page, perfil, estado, unidade, max_anos)
+    except Exception as e:
+        logging.error(f"[Worker-Erro] {perfil.tipo} - {unidade.marca} {unidade.modelo or ''}: {e}")
+
+    if unidade.modelo is not None:
+        if not completo:
+            await estado.liberar_modelo(unidade.mes, unidade.marca, unidade.modelo)
+        await _concluir_modelo(estado, pendentes, unidade.mes, unidade.marca, completo)
+        return
+
+    if not modelos:
+        # Marca sem modelos pendentes encerra aqui; se falhou ao abrir, não conta como processada
+        await _concluir_marca(estado, pendentes, unidade.mes, unidade.marca, concluida=modelos is not None)
+        return
+
+    pendentes[(perfil.tipo, unidade.mes, unidade.marca)] = len(modelos)
+    for modelo in modelos:
+        custo = _custo_modelo(estado, unidade.marca, modelo, max_anos)
+        agendador.adicionar((perfil, estado, UnidadeTrabalho(unidade.mes, perfil.tipo, unidade.marca, modelo, custo=custo)))
+
+
+# Lê meses e marcas do site para um tipo e devolve uma tarefa (perfil, estado, unidade da marca) por
+# (mês, marca) ainda pendente, com o custo estimado da marca na unidade
+async def tarefas_do_tipo(pool, pendentes, perfil, estado, max_marcas, max_workers):
+    async with pool.pagina() as page:
+        logging.info(f"Acessando a página principal para capturar meses e marcas ({perfil.tipo})...")
+        await preparar_pagina(page, perfil)
+        nomes_meses = await listar_opcoes(page, perfil.container("TabelaReferencia"))
+        marcas_lista = await listar_opcoes(page, perfil.container("Marca"))
+        # Códigos de mês e marca que o endpoint de preço espera (modo delta e árvore)
+        estado.codigos_mes = dict(await opcoes_com_valor(page, perfil.container("TabelaReferencia")))
+        estado.codigos_marca = dict(await opcoes_com_valor(page, perfil.container("Marca")))
+    logging.info(f"[INFO] {perfil.tipo}: {len(marcas_lista)} marcas capturadas.")
+
+    marcas = marcas_lista if max_marcas is None else marcas_lista[:max_marcas]
+    meses = nomes_meses if perfil.todos_os_meses else nomes_meses[:1]
+    meses_pendentes = [m for m in meses if not await estado.mes_feito(m)]
+    for nome_mes in meses:
+        if nome_mes not in meses_pendentes:
+            logging.info(f"[PULANDO] Mês já processado ({perfil.tipo}): {nome_mes}")
+
+    # Tamanho total e ETA do que falta, a partir do catálogo e do cache de anos
+    plano = construir_plano(perfil.tipo, meses_pendentes, carregar_catalogo(perfil.tipo), estado.anos_cache,
+                            marcas=set(marcas), feitas=await estado.feitas(meses_pendentes))
+    logar_plano(plano, workers=max_workers)
+
+    # Marca com todos os modelos concluídos neste mês nem vira tarefa
+    marcas_mes = {m: [marca for marca in marcas if not await estado.marca_feita(m, marca)] for m in meses_pendentes}
+
+    # Custo por marca = modelos pendentes x anos (cache ou média); marca fora do catálogo fica com a média
+    custos = {(mes, marca.strip().lower()): custo for (mes, marca), custo in custo_por_marca(plano).items()}
+    custo_medio = sum(custos.values()) / len(custos) if custos else 1.0
+
+    tarefas = []
+    for nome_mes in meses_pendentes:
+        pendentes[(perfil.tipo, nome_mes)] = len(marcas_mes[nome_mes])
+        if not marcas_mes[nome_mes]:
+            await estado.concluir_mes(nome_mes)
+        for nome_marca in marcas_mes[nome_mes]:
+            custo = custos.get((nome_mes, nome_marca.strip().lower()), custo_medio)
+            tarefas.append((perfil, estado, UnidadeTrabalho(nome_mes, perfil.tipo, nome_marca, custo=custo)))
+    return tarefas
+
+
+# Função principal: um navegador (headless por padrão) com max_workers contextos para todos os tipos pedidos.
+# max_workers é o teto: começa com workers_iniciais e o controle AIMD sobe ou recua conforme a resposta do site.
+# Cada página é trocada depois de max_consultas pesquisas ou limite_heap_mb de heap JS.
+# delta=True reaproveita a árvore marca > modelo > ano da execução anterior: só marcas cuja lista de modelos
+# mudou passam pela descoberta no formulário; as demais têm os preços consultados direto no endpoint
+async def run(tipos=("carro",), max_marcas=None, max_modelos=None, max_anos=None, max_workers=3, headless=True, max_consultas=300, limite_heap_mb=400, workers_iniciais=1, formato_saida=FORMATO_PADRAO, delta=False):
+    perfis = [PERFIS[t] for t in tipos]
+    controle_concorrencia.configurar(maximo=max_workers, inicial=workers_iniciais)
+
+    # Banco, registros e logs ficam com o ator de persistência; o monitor mede o quanto o laço ainda trava
+    ator = AtorPersistencia().iniciar()
+    monitor_laco.iniciar()
+    try:
+        banco = await ator.chamar(BancoEstado)
+        ator.periodica(banco.confirmar_vencido)
+        estados = []
+        try:
+            for perfil in perfis:
+                estado = EstadoColeta(perfil, ator, banco, formato_saida, delta=delta)
+                estados.append(estado)
+                await estado.abrir()
+            async with async_playwright() as p:
+                async with PoolNavegador(p, n_contextos=max_workers, headless=headless,
+                                         max_consultas=max_consultas, limite_heap_mb=limite_heap_mb) as pool:
+                    pendentes = {}
+                    tarefas = []
+                    for perfil, estado in zip(perfis, estados):
+                        tarefas += await tarefas_do_tipo(pool, pendentes, perfil, estado, max_marcas, max_workers)
+
+                    # Maiores marcas abrem primeiro (LPT); os modelos delas vão para os workers menos carregados
+                    # e workers ociosos roubam modelos pendentes dos outros, então uma marca grande usa todas as páginas
+                    agendador = AgendadorTrabalho(max_workers, custo=lambda tarefa: tarefa[2].custo, controle=controle_concorrencia)
+                    agendador.distribuir(tarefas, lpt=True)
+                    logging.info(f"\n▶ INICIANDO: {len(tarefas)} tarefas ({', '.join(tipos)}) com até {max_workers} contextos no mesmo navegador...")
+
+                    await agendador.executar(
+                        lambda tarefa, worker_id: executar_tarefa(pool, agendador, tarefa, pendentes, max_modelos, max_anos)
+                    )
+                    agendador.logar()
+                    controle_concorrencia.logar()
+                    pool.logar()
+                    for estado in estados:
+                        estado.logar_delta()
+                    await ator.chamar(banco.logar)
+        finally:
+            # Grava o último lote de registros e de commits mesmo se a execução cair
+            await ator.chamar(banco.fechar)
+            for estado in estados:
+                await estado.fechar()
+    finally:
+        await ator.fechar()
+        await monitor_laco.parar()
+        ator.logar()
+
+
+def logar_relatorios():
+    relatorio_esperas.logar()
+    contador_reselecao.logar()
+    metricas_rede.logar()
+    logar_limites()
+    politica_padrao.logar()
+    monitor_laco.logar()
+
+
+# Gera o Excel final de cada tipo, uma única vez, com a versão vigente de cada registro segundo o índice,
+# e regrava as partições tipo=/mes= do dataset Parquet com os mesmos registros
+def exportar_final(tipos=("carro",), dataset=True):
+    for tipo in tipos:
+        perfil = PERFIS[tipo]
+        # Excel temporário de execuções anteriores ao formato em segmentos
+        legado = [pd.read_excel(perfil.arquivo_temp, dtype=str)] if os.path.exists(perfil.arquivo_temp) else []
+        Fipe_df = ler_registros(perfil.pasta_registros, tipo, legado=legado)
+        if Fipe_df.empty:
+            logging.warning(f"[FINAL] Nenhum dado coletado para {tipo} (pasta {perfil.pasta_registros} vazia).")
+            continue
+        print(f"\n\nDADOS FINAIS COLETADOS ({tipo})")
+        print(Fipe_df)
+        Fipe_df.to_excel(perfil.arquivo_final, index=False)
+        if dataset:
+            gravar_dataset(Fipe_df, tipo, "filtros")
@@ -0,0 +1,356 @@
+import time
+import asyncio
+import logging
+
+import pandas as pd
+from playwright.async_api import async_playwright
+
+from nucleo_fipe.perfis import PERFIS
+from nucleo_fipe.resultado import pesquisar_e_capturar
+from nucleo_fipe.selecao import selecionar_opcao_js, opcoes_com_valor
+from nucleo_fipe.contexto import navegar, metricas_rede
+from nucleo_fipe.pool import PoolNavegador
+from nucleo_fipe.concorrencia import controle_concorrencia
+from nucleo_fipe.limitador import logar_limites
+from nucleo_fipe.tentativas import politica_padrao, classificar_erro
+from nucleo_fipe.saida import criar_saida, ler_registros, FORMATO_PADRAO
+from nucleo_fipe.persistencia import AtorPersistencia, monitor_laco
+from nucleo_fipe.banco_estado import BancoEstado
+from nucleo_fipe.dataset import gravar_dataset
+from nucleo_fipe.esperas import esperar_opcoes_carregadas, esperar_selecao_confirmada, esperar_campo_vazio, relatorio_esperas
+
+# Motor único da pesquisa por código FIPE (aba "Pesquisa por código") para carros, motos e caminhões.
+# Os CodigoFipe_*.py só informam o perfil e a lista de códigos.
+
+# Lê o registro do JSON que o site busca ao clicar em Pesquisar (DOM só como fallback)
+CAPTURAR_XHR = True
+
+# Seleciona o ano direto no <select> via JS em vez de andar com as setas
+SELECAO_JS = True
+
+# "Marca" das unidades da pesquisa por código no banco de estado; o código FIPE vai no lugar do modelo
+MARCA_CODIGO = "(pesquisa por código)"
+
+# Timeouts curtos por tentativa; quem insiste é a política de retentativa
+TIMEOUT_ETAPA = 15000
+TIMEOUT_PESQUISA = 20000
+TIMEOUT_NAVEGACAO = 45000
+
+
+# Seleciona a aba de pesquisa por código
+async def selecionar_aba_pesquisa_por_codigo(page, perfil):
+    await page.click(perfil.aba_codigo)
+    await page.wait_for_selector(perfil.campo_codigo, timeout=10000)
+
+
+# Abre dropdown de ano-modelo
+async def abrir_dropdown_e_esperar(page, chosen_id):
+    await page.click(f'#{chosen_id}')
+    await page.wait_for_selector(f'#{chosen_id} .chosen-drop li', timeout=TIMEOUT_ETAPA)
+
+
+# Seleciona item no dropdown (via JS ou com setas)
+async def selecionar_item_por_index(page, container_id, index, use_arrow=False, use_js=None):
+    use_js = SELECAO_JS if use_js is None else use_js
+    if use_js:
+        await selecionar_opcao_js(page, container_id, indice=index)
+        return
+    logging.info(f"Dropdown {container_id} → item {index+1}")
+    await abrir_dropdown_e_esperar(page, container_id)
+    await page.focus(f'div.chosen-container#{container_id} > a')
+    await esperar_opcoes_carregadas(page, container_id, sleep_antigo=1, timeout=TIMEOUT_ETAPA, ponto="codigo_abrir_ano")
+
+    if use_arrow:
+        await page.keyboard.press("Home")
+        for _ in range(index):
+            await page.keyboard.press("ArrowDown")
+            await asyncio.sleep(0.15)
+        await page.keyboard.press("Enter")
+    else:
+        itens = await page.query_selector_all(
+            f'div.chosen-container#{container_id} ul.chosen-results > li')
+        if index < len(itens):
+            await itens[index].scroll_into_view_if_needed()
+            await itens[index].click()
+    await esperar_selecao_confirmada(page, container_id, sleep_antigo=0.8, timeout=TIMEOUT_ETAPA, ponto="codigo_selecionar_ano")
+
+
+# Clica no botão para limpar a pesquisa após pegar os dados da tabela
+async def limpar_pesquisa(page, perfil):
+    try:
+        # Aguarda o botão ficar visível
+        await page.wait_for_selector(perfil.botao_limpar_codigo, state='visible', timeout=TIMEOUT_ETAPA)
+
+        # Força scroll e clica no botão
+        limpar_link = page.locator(perfil.botao_limpar_codigo)
+        await limpar_link.scroll_into_view_if_needed()
+        await limpar_link.click()
+        logging.info(">>> Pesquisa limpa com sucesso.")
+
+        # Aguarda o campo de código FIPE voltar a ficar vazio (antes: 0,5s + 0,8s fixos em volta do clique)
+        await esperar_campo_vazio(page, perfil.campo_codigo, sleep_antigo=1.3, timeout=TIMEOUT_ETAPA, ponto="codigo_limpar_pesquisa")
+        logging.info(">>> Confirmação visual: campo de Código FIPE resetado.")
+
+    except Exception as e:
+        logging.warning(f"[ERRO ao tentar limpar pesquisa]: {e}")
+
+
+# Preenche o código e espera o site carregar os anos dele (AJAX): depois do "Limpar Pesquisa" o <select>
+# de anos fica vazio, e selecionar por índice antes de ele popular falha ou pega a lista errada
+async def preencher_codigo(page, perfil, cod_fipe, ponto="anos_do_codigo"):
+    await page.fill(perfil.campo_codigo, cod_fipe)
+    await esperar_opcoes_carregadas(page, perfil.container_ano_codigo, timeout=TIMEOUT_ETAPA, ponto=ponto)
+
+
+# Navega, abre a aba do tipo e a pesquisa por código
+async def preparar_pagina(page, perfil):
+    await navegar(page, timeout=TIMEOUT_NAVEGACAO)
+    await page.click(f'li:has-text("{perfil.aba}")')
+    await selecionar_aba_pesquisa_por_codigo(page, perfil)
+
+
+# Processa um único código FIPE; gravar(dados) só enfileira o registro para o ator de persistência.
+# Devolve (anos coletados, anos encontrados)
+async def extracao_dados(page, perfil, gravar, cod_fipe, max_anos=None):
+    await preencher_codigo(page, perfil, cod_fipe)
+    await abrir_dropdown_e_esperar(page, perfil.container_ano_codigo)
+
+    anos = await page.query_selector_all(f'div#{perfil.container_ano_codigo} ul.chosen-results > li:not(.group-result)')
+    total_anos = len(anos) if max_anos is None else min(max_anos, len(anos))
+    logging.info(f"[{cod_fipe}] {total_anos} ano(s) encontrados")
+
+    async def consultar_ano(ano_idx):
+        await selecionar_item_por_index(page, perfil.container_ano_codigo, ano_idx, use_arrow=True)
+        logging.info(f">>> Coletando ano {ano_idx+1}/{total_anos} para código {cod_fipe}")
+        return await pesquisar_e_capturar(
+            page,
+            perfil.botao_pesquisar_codigo,
+            perfil.seletor_resultado_codigo,
+            perfil.tabela_resultado_codigo,
+            interceptar=CAPTURAR_XHR,
+            timeout=TIMEOUT_PESQUISA
+        )
+
+    # Página que caiu volta para a pesquisa por código com o código preenchido
+    async def recuperar(classe):
+        if classe == "navegacao":
+            await preparar_pagina(page, perfil)
+        await preencher_codigo(page, perfil, cod_fipe, ponto="anos_do_codigo_retentativa")
+
+    coletados = 0
+    for ano_idx in range(total_anos):
+        try:
+            dados = await politica_padrao.executar("pesquisa", consultar_ano, ano_idx, recuperar=recuperar)
+            logging.info(f"[OK] {dados['CodigoFipe']} - {dados['AnoSelecionado']}")
+            await gravar(dados)
+            coletados += 1
+
+        except Exception as e:
+            logging.warning(f"[ERRO] Falha no ano {ano_idx+1} de {cod_fipe}: {e}")
+
+        # Limpa a pesquisa para o próximo ano
+        await limpar_pesquisa(page, perfil)
+
+        # Preenche o código novamente e espera os anos voltarem antes de selecionar o próximo.
+        # Se não voltarem, a consulta do próximo ano falha e a retentativa preenche de novo
+        if ano_idx + 1 < total_anos:
+            try:
+                await preencher_codigo(page, perfil, cod_fipe, ponto="anos_do_codigo_proximo")
+            except Exception as e:
+                logging.warning(f"[ERRO] Anos de {cod_fipe} não recarregaram após limpar: {e}")
+    return coletados, total_anos
+
+
+# Cada código pega uma página do pool compartilhado, já aberta na pesquisa por código
+async def processar_codigo(pool, perfil, gravar, cod, worker_id, max_anos=None):
+    async with pool.pagina(preparar=lambda page: preparar_pagina(page, perfil), chave=(perfil.tipo, "codigo")) as page:
+        try:
+            logging.info(f"[Worker {worker_id}] Iniciando código FIPE: {cod}")
+            return await extracao_dados(page, perfil, gravar, cod, max_anos=max_anos)
+        except Exception as e:
+            logging.warning(f"[Worker {worker_id}] Falhou no código {cod}: {e}")
+            await selecionar_aba_pesquisa_por_codigo(page, perfil)
+            return 0, 0
+
+
+# Mês de referência atual (primeira opção da tabela de referência), o mesmo nome de mês que o modo por marca usa
+async def mes_atual(pool, perfil):
+    async with pool.pagina(preparar=lambda page: preparar_pagina(page, perfil), chave=(perfil.tipo, "codigo")) as page:
+        return (await opcoes_com_valor(page, perfil.container("TabelaReferencia")))[0][0]
+
+
+# Progresso da pesquisa por código no banco de estado: cada código é a unidade (mes, tipo, MARCA_CODIGO, código, None).
+# Execução reiniciada pula os códigos já concluídos no mês e dois processos não pegam o mesmo código.
+# Código só conclui com todos os anos coletados; código incompleto fica como falha e volta na próxima execução
+class EstadoCodigos:
+    def __init__(self, perfil, ator, banco, mes):
+        self.perfil = perfil
+        self.ator = ator
+        self.banco = banco
+        self.mes = mes
+
+    def _chave(self, cod):
+        return (self.mes, self.perfil.tipo, MARCA_CODIGO, cod, None)
+
+    async def concluidos(self):
+        chaves = await self.ator.chamar(self.banco.concluidas, self.perfil.tipo, [self.mes])
+        return {modelo for (_, _, marca, modelo, _) in chaves if marca == MARCA_CODIGO}
+
+    # Reserva que falhou (ex.: banco travado por outro processo) deixa o código para a próxima execução
+    async def reservar(self, cod):
+        try:
+            return await self.ator.chamar(self.banco.reservar, self._chave(cod))
+        except Exception as e:
+            logging.error(f"[RESERVA] Falha ao reservar o código {cod} ({self.mes}): {e}")
+            return False
+
+    # A conclusão entra na fila do ator depois dos registros do código, e o commit do lote descarrega a saída antes
+    async def encerrar(self, cod, anos, total, duracao, erro=None):
+        if erro is None and total and anos == total:
+            await self.ator.enviar(self.banco.concluir, self._chave(cod), duracao)
+            return
+        if erro is None:
+            classe, erro = "incompleto", f"{anos}/{total} ano(s) coletados"
+        else:
+            classe = classificar_erro(erro)
+        await self.ator.enviar(self.banco.registrar_falha, self._chave(cod), classe, erro)
+
+
+# Latência de cada código (todos os anos dele) e vazão do runner
+class RelatorioCodigos:
+    def __init__(self, total):
+        self.total = total
+        self.duracoes = []
+        self.anos = 0
+        self.vazios = 0
+        self.reservados = 0
+        self.por_worker = {}
+        self.inicio = None
+        self.fim = None
+
+    def registrar(self, worker_id, cod, duracao, anos):
+        self.duracoes.append(duracao)
+        self.anos += anos
+        if not anos:
+            self.vazios += 1
+        self.por_worker[worker_id] = self.por_worker.get(worker_id, 0) + 1
+        logging.info(f"[CÓDIGO] {cod}: {anos} ano(s) em {duracao:.1f}s (worker {worker_id}, "
+                     f"{len(self.duracoes)}/{self.total})")
+
+    def _percentil(self, p):
+        ordenadas = sorted(self.duracoes)
+        return ordenadas[min(len(ordenadas) - 1, int(p * len(ordenadas)))]
+
+    def logar(self):
+        if not self.duracoes or self.inicio is None:
+            return
+        total = (self.fim or time.perf_counter()) - self.inicio
+        por_minuto = len(self.duracoes) / total * 60 if total else 0.0
+        logging.info(
+            f"[CÓDIGO] {len(self.duracoes)} códigos, {self.anos} anos em {total:.0f}s ({por_minuto:.1f} códigos/min); "
+            f"latência p50 {self._percentil(0.5):.1f}s, p95 {self._percentil(0.95):.1f}s, máx {max(self.duracoes):.1f}s; "
+            f"{self.vazios} sem nenhum ano, {self.reservados} reservados por outro processo"
+        )
+        logging.info("[CÓDIGO] Por worker: " + ", ".join(f"{w}: {n}" for w, n in sorted(self.por_worker.items())))
+
+
+# Worker da fila compartilhada: pega o próximo código assim que termina o anterior.
+# A vaga do controle AIMD é pega antes do código, então worker sem vaga não segura código na mão
+async def worker_codigos(pool, perfil, fila, gravar, worker_id, max_anos, relatorio, estado):
+    while True:
+        async with controle_concorrencia.vaga():
+            try:
+                cod = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if not await estado.reservar(cod):
+                logging.info(f"[RESERVA] Código {cod} reservado por outro processo ou já concluído, pulando")
+                relatorio.reservados += 1
+                fila.task_done()
+                continue
+            inicio = time.perf_counter()
+            erro = None
+            try:
+                anos, total = await processar_codigo(pool, perfil, gravar, cod, worker_id, max_anos)
+            except Exception as e:
+                logging.error(f"[Worker {worker_id}] Página do pool falhou no código {cod}: {e}")
+                anos, total, erro = 0, 0, e
+            duracao = time.perf_counter() - inicio
+            await estado.encerrar(cod, anos, total, duracao, erro)
+            relatorio.registrar(worker_id, cod, duracao, anos)
+            fila.task_done()
+
+
+# n_workers workers consomem uma fila única de códigos, cada um com uma página do pool (um navegador,
+# n_workers contextos); quantos rodam ao mesmo tempo é decidido pelo controle AIMD até o teto n_workers.
+# Códigos já concluídos no mês de referência atual (banco de estado) não entram na fila
+async def run_paralelo(tipo, lista_codigos, n_workers=4, max_anos=None, headless=True, workers_iniciais=1, formato_saida=FORMATO_PADRAO):
+    perfil = PERFIS[tipo]
+    controle_concorrencia.configurar(maximo=n_workers, inicial=workers_iniciais)
+    codigos = list(dict.fromkeys(str(c).strip() for c in lista_codigos))
+    # Banco e segmentos de registros só são escritos pela thread do ator, fora do laço dos workers
+    ator = AtorPersistencia().iniciar()
+    monitor_laco.iniciar()
+    try:
+        banco = await ator.chamar(BancoEstado)
+        ator.periodica(banco.confirmar_vencido)
+        saida = await ator.chamar(criar_saida, perfil.pasta_registros_codigo, formato_saida, tipo=tipo)
+        # Conclusões só vão para o banco depois dos registros do código estarem em disco
+        await ator.chamar(banco.ao_confirmar, saida.descarregar)
+
+        async def gravar(dados):
+            await ator.enviar(saida.gravar, dados)
+
+        try:
+            async with async_playwright() as p:
+                async with PoolNavegador(p, n_contextos=n_workers, headless=headless) as pool:
+                    estado = EstadoCodigos(perfil, ator, banco, await mes_atual(pool, perfil))
+                    concluidos = await estado.concluidos()
+                    fila = asyncio.Queue()
+                    for cod in codigos:
+                        if cod not in concluidos:
+                            fila.put_nowait(cod)
+                    logging.info(f"[CÓDIGO] {estado.mes}: {len(codigos) - fila.qsize()} código(s) já coletados, "
+                                 f"{fila.qsize()} na fila")
+                    relatorio = RelatorioCodigos(fila.qsize())
+                    relatorio.inicio = time.perf_counter()
+                    await asyncio.gather(*(
+                        worker_codigos(pool, perfil, fila, gravar, w + 1, max_anos, relatorio, estado) for w in range(n_workers)
+                    ))
+                    relatorio.fim = time.perf_counter()
+                    await ator.chamar(banco.logar, tipo)
+        finally:
+            # Grava o último lote de registros e de commits mesmo se a execução cair
+            await ator.chamar(banco.fechar)
+            await ator.chamar(saida.fechar)
+    finally:
+        await ator.fechar()
+        await monitor_laco.parar()
+    relatorio.logar()
+    relatorio_esperas.logar()
+    controle_concorrencia.logar()
+    metricas_rede.logar()
+    logar_limites()
+    politica_padrao.logar()
+    ator.logar()
+    monitor_laco.logar()
+
+
+# Junta a versão vigente de cada registro (índice dos segmentos) e os Excel temporários de execuções
+# antigas, estes só nas chaves que os segmentos não têm, no arquivo final do tipo e nas partições do dataset
+def consolidar(tipo, dataset=True):
+    perfil = PERFIS[tipo]
+    legado = []
+    for f in perfil.arquivos_temp_codigo():
+        try:
+            legado.append(pd.read_excel(f, dtype=str))
+        except Exception as e:
+            logging.warning(f"Erro ao ler {f}: {e}")
+    final = ler_registros(perfil.pasta_registros_codigo, tipo, legado=legado)
+    if not final.empty:
+        final.to_excel(perfil.arquivo_final_codigo, index=False)
+        print(f" Arquivo final salvo como {perfil.arquivo_final_codigo}")
+        if dataset:
+            gravar_dataset(final, tipo, "codigo")
+    else:
+        print(" Nenhum dado foi processado para consolidar.")
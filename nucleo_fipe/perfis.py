@@ -0,0 +1,142 @@
+import os
+import glob
+from dataclasses import dataclass
+
+# Tudo o que muda entre carros, motos e caminhões: sufixo dos ids no site, texto da aba e nomes de arquivo.
+# Os ids seguem o padrão do site: select{Campo}{tipo}_chosen, #buttonPesquisar{tipo}, resultadoConsulta{tipo}Filtros...
+@dataclass(frozen=True)
+class PerfilVeiculo:
+    tipo: str
+    aba: str
+    sufixo_arquivo: str
+    arquivo_temp: str
+    arquivo_final: str
+    arquivo_final_codigo: str
+    # Carros percorre todos os meses da tabela de referência; motos e caminhões só o mais recente
+    todos_os_meses: bool = False
+    # Prefixo dos Excel temporários por worker dos antigos CodigoFipe_*.py (Fipe_temp_teste2{id}.xlsx, ...)
+    prefixo_temp_codigo_legado: str = ""
+
+    # Pesquisa por filtros (marca > modelo > ano)
+    def container(self, campo):
+        return f"select{campo}{self.tipo}_chosen"
+
+    @property
+    def botao_pesquisar(self):
+        return f"#buttonPesquisar{self.tipo}"
+
+    @property
+    def botao_limpar(self):
+        return f"#buttonLimparPesquisar{self.tipo} a.text"
+
+    @property
+    def seletor_resultado(self):
+        return f"div#resultadoConsulta{self.tipo}Filtros"
+
+    @property
+    def tabela_resultado(self):
+        return f"resultadoConsulta{self.tipo}Filtros"
+
+    # Dropdown recarregado pelo site quando o anterior muda (para esperar o AJAX terminar)
+    @property
+    def dependentes(self):
+        return {
+            self.container("TabelaReferencia"): f"selectMarca{self.tipo}",
+            self.container("Marca"): f"selectAnoModelo{self.tipo}",
+            self.container("AnoModelo"): f"selectAno{self.tipo}",
+        }
+
+    # Pastas com os segmentos de registros (ver saida.py)
+    @property
+    def pasta_registros(self):
+        return f"registros_{self.sufixo_arquivo}"
+
+    @property
+    def pasta_registros_codigo(self):
+        return f"registros_codigo_{self.sufixo_arquivo}"
+
+    @property
+    def pasta_registros_api(self):
+        return f"registros_api_{self.sufixo_arquivo}"
+
+    # Arquivos de progresso antigos, só lidos uma vez para importar no banco de estado
+    @property
+    def arquivo_diario(self):
+        return f"progresso_{self.sufixo_arquivo}.jsonl"
+
+    @property
+    def arquivo_meses(self):
+        return f"meses_processados_{self.sufixo_arquivo}.json"
+
+    # Pesquisa por código FIPE
+    @property
+    def aba_codigo(self):
+        return f'a[data-aba="Aba{self.tipo}-codigo"]'
+
+    @property
+    def campo_codigo(self):
+        return f"#selectCodigo{self.tipo}CodigoFipe"
+
+    @property
+    def container_ano_codigo(self):
+        return f"selectCodigoAno{self.tipo}CodigoFipe_chosen"
+
+    @property
+    def botao_pesquisar_codigo(self):
+        return f"#buttonPesquisar{self.tipo}PorCodigoFipe"
+
+    @property
+    def botao_limpar_codigo(self):
+        return f"#buttonLimparPesquisar{self.tipo}PorCodigoFipe"
+
+    @property
+    def seletor_resultado_codigo(self):
+        return f"div#resultado{self.tipo}CodigoFipe"
+
+    @property
+    def tabela_resultado_codigo(self):
+        return f"resultadoConsulta{self.tipo}CodigoFipe"
+
+    @property
+    def prefixo_temp_codigo(self):
+        return f"Fipe_temp_codigo_{self.sufixo_arquivo}"
+
+    # Excel temporários da pesquisa por código de execuções anteriores aos segmentos: os por worker do motor
+    # único ({prefixo_temp_codigo}_w{id}.xlsx) e os dos scripts antigos ({prefixo_temp_codigo_legado}{id}.xlsx)
+    def arquivos_temp_codigo(self, pasta="."):
+        padroes = [f"{self.prefixo_temp_codigo}_w*.xlsx"]
+        if self.prefixo_temp_codigo_legado:
+            padroes.append(f"{self.prefixo_temp_codigo_legado}*.xlsx")
+        return sorted({f for padrao in padroes for f in glob.glob(os.path.join(pasta, padrao))})
+
+
+PERFIS = {
+    "carro": PerfilVeiculo(
+        tipo="carro",
+        aba="Carros e utilitários pequenos",
+        sufixo_arquivo="carros",
+        arquivo_temp="Fipe_temp.xlsx",
+        arquivo_final="Fipe.xlsx",
+        arquivo_final_codigo="Fipe_temp_final.xlsx",
+        todos_os_meses=True,
+        prefixo_temp_codigo_legado="Fipe_temp_teste2",
+    ),
+    "moto": PerfilVeiculo(
+        tipo="moto",
+        aba="Motos",
+        sufixo_arquivo="motos",
+        arquivo_temp="Fipe_temp_motos.xlsx",
+        arquivo_final="Fipe_moto.xlsx",
+        arquivo_final_codigo="Fipe_temp_final_motos.xlsx",
+        prefixo_temp_codigo_legado="Fipe_temp_teste_motos",
+    ),
+    "caminhao": PerfilVeiculo(
+        tipo="caminhao",
+        aba="Caminhões e Micro-Ônibus",
+        sufixo_arquivo="caminhoes",
+        arquivo_temp="Fipe_temp_caminhao.xlsx",
+        arquivo_final="Fipe_caminhao.xlsx",
+        arquivo_final_codigo="Fipe_temp_final_caminhao.xlsx",
+        prefixo_temp_codigo_legado="Fipe_temp_teste_caminhao",
+    ),
+}
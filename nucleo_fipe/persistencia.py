@@ -0,0 +1,216 @@
+import time
+import queue
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from logging.handlers import QueueHandler, QueueListener
+
+# Todos os workers dividem um único laço asyncio: qualquer escrita síncrona (segmentos de registros,
+# banco de estado, cache de anos) feita dentro de um worker congela os outros navegadores enquanto dura.
+# O ator de persistência é uma thread dedicada dona de todas essas escritas: os workers só enfileiram
+# (enviar) ou pedem uma resposta (chamar). A fila é limitada: se o disco não acompanha, quem enfileira
+# espera (contrapressão) em vez de acumular registros na memória.
+# Como uma única thread executa tudo na ordem de chegada, o registro enfileirado antes da conclusão
+# da unidade chega ao disco antes do commit dela, e uma leitura enxerga as escritas enfileiradas antes.
+# Objetos com estado de thread (conexão SQLite) devem ser criados pelo próprio ator: chamar(BancoEstado).
+LIMITE_FILA = 1000
+
+# De quanto em quanto tempo o ator roda as tarefas periódicas (ex.: commit do lote pendente do banco),
+# esteja a fila vazia ou não
+INTERVALO_PERIODICO = 1.0
+
+_FIM = object()
+
+
+class AtorPersistencia:
+    def __init__(self, limite=LIMITE_FILA, logs=True, intervalo_periodico=INTERVALO_PERIODICO):
+        self.fila = queue.Queue(maxsize=limite)
+        self.logs = logs
+        self.intervalo_periodico = intervalo_periodico
+        self.periodicas = []
+        self.ultima_periodica = time.monotonic()
+        self.thread = None
+        self.ouvinte_logs = None
+        self.handlers_originais = []
+        self.executadas = 0
+        self.falhas = 0
+        self.maior_fila = 0
+        self.tempo_execucao = 0.0
+        self.contrapressoes = 0
+        self.tempo_contrapressao = 0.0
+
+    def iniciar(self):
+        if self.thread is not None:
+            return self
+        self.thread = threading.Thread(target=self._rodar, name="persistencia", daemon=True)
+        self.thread.start()
+        if self.logs:
+            self._logs_em_segundo_plano()
+        return self
+
+    # Os handlers do logging (console, arquivo) passam a escrever numa thread própria do logging;
+    # no laço o logging.info só enfileira o registro
+    def _logs_em_segundo_plano(self):
+        raiz = logging.getLogger()
+        self.handlers_originais = list(raiz.handlers)
+        if not self.handlers_originais:
+            return
+        fila_logs = queue.Queue()
+        for handler in self.handlers_originais:
+            raiz.removeHandler(handler)
+        raiz.addHandler(QueueHandler(fila_logs))
+        self.ouvinte_logs = QueueListener(fila_logs, *self.handlers_originais, respect_handler_level=True)
+        self.ouvinte_logs.start()
+
+    def _restaurar_logs(self):
+        if self.ouvinte_logs is None:
+            return
+        raiz = logging.getLogger()
+        for handler in list(raiz.handlers):
+            if isinstance(handler, QueueHandler):
+                raiz.removeHandler(handler)
+        self.ouvinte_logs.stop()
+        for handler in self.handlers_originais:
+            raiz.addHandler(handler)
+        self.ouvinte_logs = None
+
+    # funcao() roda na thread do ator a cada intervalo_periodico segundos, inclusive com a fila parada:
+    # sem isso o que depende da próxima escrita (commit em lote do banco) fica esperando indefinidamente
+    def periodica(self, funcao):
+        self.periodicas.append(funcao)
+
+    def _rodar_periodicas(self):
+        self.ultima_periodica = time.monotonic()
+        for funcao in list(self.periodicas):
+            try:
+                funcao()
+            except Exception as e:
+                self.falhas += 1
+                logging.error(f"[PERSISTÊNCIA] Tarefa periódica {getattr(funcao, '__qualname__', funcao)} falhou: {e}")
+
+    def _rodar(self):
+        while True:
+            if self.periodicas and time.monotonic() - self.ultima_periodica >= self.intervalo_periodico:
+                self._rodar_periodicas()
+            try:
+                item = self.fila.get(timeout=self.intervalo_periodico)
+            except queue.Empty:
+                continue
+            if item is _FIM:
+                break
+            funcao, args, kwargs, futuro = item
+            inicio = time.perf_counter()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception as e:
+                self.falhas += 1
+                if futuro is not None:
+                    futuro.set_exception(e)
+                else:
+                    logging.error(f"[PERSISTÊNCIA] {getattr(funcao, '__qualname__', funcao)} falhou: {e}")
+            else:
+                if futuro is not None:
+                    futuro.set_result(resultado)
+            self.tempo_execucao += time.perf_counter() - inicio
+            self.executadas += 1
+
+    # Enfileira sem bloquear o laço; com a fila cheia a espera vai para uma thread do executor
+    async def _enfileirar(self, item):
+        if self.thread is None:
+            raise RuntimeError("Ator de persistência não iniciado")
+        try:
+            self.fila.put_nowait(item)
+        except queue.Full:
+            inicio = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(None, self.fila.put, item)
+            self.contrapressoes += 1
+            self.tempo_contrapressao += time.perf_counter() - inicio
+        self.maior_fila = max(self.maior_fila, self.fila.qsize())
+
+    # Escrita sem resposta: volta assim que está na fila. Erros só aparecem no log
+    async def enviar(self, funcao, *args, **kwargs):
+        await self._enfileirar((funcao, args, kwargs, None))
+
+    # Executa no ator e devolve o resultado (ou levanta o erro) para quem chamou
+    async def chamar(self, funcao, *args, **kwargs):
+        futuro = concurrent.futures.Future()
+        await self._enfileirar((funcao, args, kwargs, futuro))
+        return await asyncio.wrap_future(futuro)
+
+    # Espera o ator gravar tudo o que já foi enfileirado e encerra a thread
+    async def fechar(self):
+        if self.thread is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.fila.put, _FIM)
+        await asyncio.get_running_loop().run_in_executor(None, self.thread.join)
+        self.thread = None
+        self._restaurar_logs()
+
+    def logar(self):
+        if not self.executadas:
+            return
+        logging.info(
+            f"[PERSISTÊNCIA] {self.executadas} operações fora do laço ({self.tempo_execucao:.1f}s de I/O), "
+            f"{self.falhas} falhas, fila máx {self.maior_fila}/{self.fila.maxsize}; "
+            f"contrapressão {self.contrapressoes}x, {self.tempo_contrapressao:.1f}s"
+        )
+
+
+# Mede quanto o laço asyncio fica travado: uma tarefa dorme "intervalo" segundos e o atraso
+# além disso é tempo em que nenhum worker pôde andar (código síncrono rodando no laço)
+class MonitorLaco:
+    def __init__(self, intervalo=0.1, limiar=0.05, alerta=1.0):
+        self.intervalo = intervalo
+        self.limiar = limiar
+        self.alerta = alerta
+        self.tarefa = None
+        self.amostras = 0
+        self.travamentos = 0
+        self.tempo_travado = 0.0
+        self.maior_travamento = 0.0
+        self.inicio = None
+        self.fim = None
+
+    async def _medir(self):
+        while True:
+            antes = time.perf_counter()
+            await asyncio.sleep(self.intervalo)
+            atraso = time.perf_counter() - antes - self.intervalo
+            self.amostras += 1
+            if atraso >= self.limiar:
+                self.travamentos += 1
+                self.tempo_travado += atraso
+                self.maior_travamento = max(self.maior_travamento, atraso)
+                if atraso >= self.alerta:
+                    logging.warning(f"[LAÇO] Laço de eventos travado por {atraso:.2f}s")
+
+    def iniciar(self):
+        if self.tarefa is None:
+            self.inicio = time.perf_counter()
+            self.fim = None
+            self.tarefa = asyncio.get_running_loop().create_task(self._medir())
+
+    async def parar(self):
+        if self.tarefa is None:
+            return
+        self.tarefa.cancel()
+        try:
+            await self.tarefa
+        except asyncio.CancelledError:
+            pass
+        self.tarefa = None
+        self.fim = time.perf_counter()
+
+    def logar(self):
+        if self.inicio is None:
+            return
+        total = (self.fim or time.perf_counter()) - self.inicio
+        fracao = self.tempo_travado / total if total else 0.0
+        logging.info(
+            f"[LAÇO] {self.travamentos} travamentos acima de {self.limiar * 1000:.0f}ms em {self.amostras} amostras: "
+            f"{self.tempo_travado:.1f}s travado ({fracao:.1%} de {total:.0f}s), maior {self.maior_travamento:.2f}s"
+        )
+
+
+monitor_laco = MonitorLaco()
@@ -0,0 +1,214 @@
+import os
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from nucleo_fipe.perfis import PERFIS
+
+# Catálogo gerado pelos scanners ({"_meta": ..., "dados": {marca: [modelos]}}) e cache dos anos
+# de cada modelo, preenchido pelos scrapers conforme abrem o dropdown de ano
+CATALOGO_JSON = "catalogo_modelos_{sufixo}.json"
+CACHE_ANOS_JSON = "anos_modelos_{sufixo}.json"
+
+# Árvore marca > modelo > ano com os códigos que o site manda ao endpoint de preço (values dos <select>),
+# atualizada a cada execução; o modo delta usa a do mês anterior para consultar preços sem o formulário
+ARVORE_JSON = "arvore_{sufixo}.json"
+
+# Custo de um modelo cujos anos ainda não estão no cache (em consultas); sobrescrito pela média do cache
+ANOS_POR_MODELO_PADRAO = 8
+
+# Tempo médio de uma consulta no navegador, só para a estimativa de duração
+SEGUNDOS_POR_CONSULTA = 6.0
+
+
+# Menor pedaço de trabalho agendável: uma consulta (ano definido), um modelo inteiro (ano=None, anos desconhecidos)
+# ou uma marca ainda não aberta (modelo=None), que vira unidades por modelo quando o worker lista os modelos
+@dataclass
+class UnidadeTrabalho:
+    mes: str
+    tipo: str
+    marca: str
+    modelo: Optional[str] = None
+    ano: Optional[str] = None
+    custo: float = 1.0
+
+    # Identifica a unidade para retomada e deduplicação
+    @property
+    def chave(self):
+        return (self.mes, self.tipo, self.marca, self.modelo, self.ano)
+
+
+# catalogo_modelos_motos.json, anos_modelos_caminhoes.json, ...
+def _sufixo(tipo: str) -> str:
+    return PERFIS[tipo].sufixo_arquivo if tipo in PERFIS else tipo
+
+
+def _norm(s: str) -> str:
+    return (s or "").strip().lower()
+
+
+def carregar_catalogo(tipo: str, caminho: str = None) -> dict:
+    caminho = caminho or CATALOGO_JSON.format(sufixo=_sufixo(tipo))
+    if not os.path.exists(caminho):
+        logging.warning(f"[PLANO] Catálogo {caminho} não encontrado.")
+        return {}
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            bruto = json.load(f)
+    except Exception as e:
+        logging.error(f"[PLANO] Erro lendo {caminho}: {e}")
+        return {}
+    if isinstance(bruto, dict) and "dados" in bruto:
+        bruto = bruto["dados"]
+    catalogo = {}
+    for marca, modelos in (bruto or {}).items():
+        if isinstance(modelos, list):
+            catalogo[marca.strip()] = [m.strip() for m in modelos if (m or "").strip()]
+        else:
+            logging.warning(f"[PLANO] Modelos da marca '{marca}' não é lista. Ignorando.")
+    return catalogo
+
+
+def carregar_cache_anos(tipo: str, caminho: str = None) -> dict:
+    caminho = caminho or CACHE_ANOS_JSON.format(sufixo=_sufixo(tipo))
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"[PLANO] Erro lendo cache de anos {caminho}: {e}")
+        return {}
+
+
+def salvar_cache_anos(tipo: str, cache: dict, caminho: str = None):
+    caminho = caminho or CACHE_ANOS_JSON.format(sufixo=_sufixo(tipo))
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+# Guarda a lista de anos de um modelo; retorna True se mudou (para o chamador decidir se salva)
+def registrar_anos(cache: dict, marca: str, modelo: str, anos: list) -> bool:
+    anos = [a.strip() for a in anos if (a or "").strip()]
+    modelos = cache.setdefault(marca.strip(), {})
+    if modelos.get(modelo.strip()) == anos:
+        return False
+    modelos[modelo.strip()] = anos
+    return True
+
+
+def media_anos(cache: dict) -> float:
+    contagens = [len(anos) for modelos in cache.values() for anos in modelos.values() if anos]
+    return sum(contagens) / len(contagens) if contagens else ANOS_POR_MODELO_PADRAO
+
+
+def anos_do_cache(cache: dict, marca: str, modelo: str):
+    modelos = cache.get(marca)
+    if modelos is None:
+        modelos = next((v for k, v in cache.items() if _norm(k) == _norm(marca)), {})
+    return modelos.get(modelo)
+
+
+# {marca: {"codigo": "21", "modelos": {modelo: {"codigo": "4828", "anos": [[texto, "2015-1"], ...]}}}}
+def carregar_arvore(tipo: str, caminho: str = None) -> dict:
+    caminho = caminho or ARVORE_JSON.format(sufixo=_sufixo(tipo))
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logging.warning(f"[PLANO] Erro lendo árvore {caminho}: {e}")
+        return {}
+
+
+def salvar_arvore(tipo: str, arvore: dict, caminho: str = None):
+    caminho = caminho or ARVORE_JSON.format(sufixo=_sufixo(tipo))
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(arvore, f, ensure_ascii=False)
+
+
+# Modelos de uma marca como o site listou agora ([(nome, código)]); anos já conhecidos de cada modelo
+# ficam se o código do modelo não mudou
+def registrar_marca_arvore(arvore: dict, marca: str, codigo, modelos: list):
+    anterior = arvore.get(marca.strip(), {})
+    antigos = anterior.get("modelos", {})
+    novos = {}
+    for nome, codigo_modelo in modelos:
+        antigo = antigos.get(nome.strip(), {})
+        anos = antigo.get("anos", []) if antigo.get("codigo") == codigo_modelo else []
+        novos[nome.strip()] = {"codigo": codigo_modelo, "anos": anos}
+    arvore[marca.strip()] = {"codigo": codigo or anterior.get("codigo"), "modelos": novos}
+
+
+def registrar_anos_arvore(arvore: dict, marca: str, modelo: str, codigo_modelo, anos: list):
+    modelos = arvore.setdefault(marca.strip(), {"codigo": None, "modelos": {}})["modelos"]
+    atual = modelos.setdefault(modelo.strip(), {"codigo": codigo_modelo, "anos": []})
+    atual["codigo"] = codigo_modelo or atual.get("codigo")
+    atual["anos"] = [[nome.strip(), valor] for nome, valor in anos]
+
+
+# Sonda do modo delta: a marca continua igual se a lista de modelos do site tem o mesmo tamanho e os mesmos
+# nomes da árvore, e todos os modelos já têm os anos com código
+def marca_sem_mudanca(arvore: dict, marca: str, nomes_modelos: list) -> bool:
+    dados = arvore.get(marca.strip())
+    if not dados or not dados.get("codigo"):
+        return False
+    modelos = dados.get("modelos", {})
+    if len(modelos) != len(nomes_modelos):
+        return False
+    return all(modelos.get(nome.strip(), {}).get("anos") for nome in nomes_modelos)
+
+
+# Expande catálogo x meses em unidades de trabalho. Modelos com anos no cache viram uma unidade por ano;
+# os demais viram uma unidade por modelo com custo estimado pela média de anos. "feitas" são as chaves já
+# concluídas do diário de progresso: (mes, tipo, marca, None, None) pula a marca e (…, modelo, None) o modelo
+def construir_plano(tipo: str, meses: list, catalogo: dict, cache_anos: dict = None, feitas=None, marcas=None) -> list:
+    cache_anos = cache_anos or {}
+    feitas = feitas or set()
+    estimativa = media_anos(cache_anos)
+    plano = []
+
+    for mes in meses:
+        for marca, modelos in catalogo.items():
+            if marcas is not None and marca not in marcas:
+                continue
+            if (mes, tipo, marca, None, None) in feitas:
+                continue
+            for modelo in modelos:
+                if (mes, tipo, marca, modelo, None) in feitas:
+                    continue
+                anos = anos_do_cache(cache_anos, marca, modelo)
+                if anos:
+                    for ano in anos:
+                        unidade = UnidadeTrabalho(mes, tipo, marca, modelo, ano, 1.0)
+                        if unidade.chave not in feitas:
+                            plano.append(unidade)
+                else:
+                    unidade = UnidadeTrabalho(mes, tipo, marca, modelo, None, estimativa)
+                    if unidade.chave not in feitas:
+                        plano.append(unidade)
+    return plano
+
+
+# Custo somado por marca (útil para agendar marcas inteiras)
+def custo_por_marca(plano: list) -> dict:
+    custos = {}
+    for u in plano:
+        custos[(u.mes, u.marca)] = custos.get((u.mes, u.marca), 0.0) + u.custo
+    return custos
+
+
+def logar_plano(plano: list, workers: int = 1, segundos_por_consulta: float = SEGUNDOS_POR_CONSULTA):
+    if not plano:
+        logging.info("[PLANO] Nada a fazer.")
+        return
+    custo = sum(u.custo for u in plano)
+    por_ano = sum(1 for u in plano if u.ano is not None)
+    marcas = len({(u.mes, u.marca) for u in plano})
+    horas = custo * segundos_por_consulta / max(workers, 1) / 3600
+    logging.info(
+        f"[PLANO] {len(plano)} unidades ({por_ano} por ano, {len(plano) - por_ano} por modelo) em {marcas} marca(s)/mês; "
+        f"~{custo:.0f} consultas, ETA ~{horas:.1f}h com {workers} worker(s)"
+    )
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from nucleo_fipe.contexto import criar_contexto
+from nucleo_fipe.resultado import ENDPOINT_RESULTADO
+
+# Checagem barata de saúde: documento carregado e heap JS (performance.memory só existe no Chromium)
+JS_SAUDE_PAGINA = """
+() => ({
+    pronta: document.readyState === 'complete',
+    heap: (performance.memory && performance.memory.usedJSHeapSize) || 0
+})
+"""
+
+
+# Um único processo de navegador com N contextos isolados; as páginas são emprestadas
+# aos workers e reaproveitadas entre os meses, em vez de abrir um Chromium por lote.
+# Com "preparar" (ex.: navegar, clicar na aba e escolher o mês) as páginas saem aquecidas,
+# e cada página é trocada por uma nova depois de max_consultas pesquisas ou limite_heap_mb de heap.
+class PoolNavegador:
+    def __init__(self, playwright, n_contextos=3, headless=True, paginas_por_contexto=1,
+                 preparar=None, max_consultas=300, limite_heap_mb=400, **opcoes_launch):
+        self.playwright = playwright
+        self.n_contextos = n_contextos
+        self.headless = headless
+        self.paginas_por_contexto = paginas_por_contexto
+        self.preparar = preparar
+        self.max_consultas = max_consultas
+        self.limite_heap_mb = limite_heap_mb
+        self.opcoes_launch = opcoes_launch
+        self.browser = None
+        self.contextos = []
+        self.livres = asyncio.Queue()
+        # Por página: consultas feitas e chave do preparo aplicada (-1 = nunca aquecida)
+        self.estado = {}
+        self.estatisticas = {"aquecimentos": 0, "por_consultas": 0, "por_heap": 0, "por_saude": 0}
+
+    @property
+    def total_paginas(self):
+        return self.n_contextos * self.paginas_por_contexto
+
+    async def __aenter__(self):
+        await self.iniciar()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.fechar()
+
+    async def iniciar(self):
+        self.browser = await self.playwright.chromium.launch(headless=self.headless, **self.opcoes_launch)
+        for _ in range(self.n_contextos):
+            context = await criar_contexto(self.browser)
+            self.contextos.append(context)
+            for _ in range(self.paginas_por_contexto):
+                self.livres.put_nowait(await self._nova_pagina(context))
+        logging.info(f"[POOL] Navegador iniciado com {self.n_contextos} contextos ({self.total_paginas} páginas, headless={self.headless})")
+
+    async def _nova_pagina(self, context):
+        page = await context.new_page()
+        estado = {"consultas": 0, "versao": -1}
+        self.estado[id(page)] = estado
+
+        # Conta as pesquisas pela resposta do endpoint de resultado, sem depender do scraper avisar
+        def contar(response):
+            if ENDPOINT_RESULTADO in response.url:
+                estado["consultas"] += 1
+
+        page.on("response", contar)
+        return page
+
+    async def _substituir(self, page):
+        context = page.context
+        self.estado.pop(id(page), None)
+        if not page.is_closed():
+            try:
+                await page.close()
+            except Exception as e:
+                logging.warning(f"[POOL] Erro ao fechar página: {e}")
+        return await self._nova_pagina(context)
+
+    # Motivo para reciclar a página, ou None se ela pode ser usada
+    async def _motivo_reciclagem(self, page):
+        if page.is_closed():
+            return "por_saude"
+        estado = self.estado.get(id(page), {})
+        if self.max_consultas and estado.get("consultas", 0) >= self.max_consultas:
+            return "por_consultas"
+        if page.url == "about:blank":
+            return None
+        try:
+            saude = await asyncio.wait_for(page.evaluate(JS_SAUDE_PAGINA), timeout=5)
+        except Exception as e:
+            logging.warning(f"[POOL] Página não respondeu à checagem de saúde: {e}")
+            return "por_saude"
+        if not saude.get("pronta"):
+            return "por_saude"
+        if self.limite_heap_mb and saude.get("heap", 0) / 1024 / 1024 >= self.limite_heap_mb:
+            return "por_heap"
+        return None
+
+    async def _garantir_pronta(self, page, preparar=None, chave=None):
+        motivo = await self._motivo_reciclagem(page)
+        if motivo:
+            consultas = self.estado.get(id(page), {}).get("consultas", 0)
+            logging.info(f"[POOL] Reciclando página ({motivo}, {consultas} consultas)")
+            self.estatisticas[motivo] += 1
+            page = await self._substituir(page)
+
+        preparar = preparar or self.preparar
+        chave = 0 if chave is None else chave
+        estado = self.estado[id(page)]
+        if preparar and estado["versao"] != chave:
+            await preparar(page)
+            estado["versao"] = chave
+            self.estatisticas["aquecimentos"] += 1
+        return page
+
+    # Empresta uma página saudável (e aquecida, se houver preparo); se o worker fechou ou
+    # derrubou a página, devolve uma nova no mesmo contexto.
+    # preparar/chave por empréstimo permitem misturar tipos e meses no mesmo pool: a página só
+    # é reaquecida quando a chave (ex.: (tipo, mes)) for diferente da última aplicada nela
+    @asynccontextmanager
+    async def pagina(self, preparar=None, chave=None):
+        page = await self.livres.get()
+        try:
+            page = await self._garantir_pronta(page, preparar, chave)
+            yield page
+        finally:
+            if page.is_closed():
+                page = await self._substituir(page)
+            self.livres.put_nowait(page)
+
+    def logar(self):
+        e = self.estatisticas
+        logging.info(
+            f"[POOL] {e['aquecimentos']} aquecimentos; páginas recicladas: {e['por_consultas']} por consultas, "
+            f"{e['por_heap']} por heap, {e['por_saude']} por saúde"
+        )
+
+    async def fechar(self):
+        for context in self.contextos:
+            try:
+                await context.close()
+            except Exception as e:
+                logging.warning(f"[POOL] Erro ao fechar contexto: {e}")
+        if self.browser:
+            await self.browser.close()
+        self.contextos = []
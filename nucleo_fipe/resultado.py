@@ -0,0 +1,150 @@
+import time
+import logging
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from nucleo_fipe.api import montar_dados, parametros_valor, URL_BASE, HEADERS
+from nucleo_fipe.concorrencia import controle_concorrencia
+from nucleo_fipe.limitador import adquirir
+from nucleo_fipe.selecao import ErroSelecao, ResultadoDesatualizado
+from nucleo_fipe.saida import normalizar_ano
+
+# Endpoint chamado pelo site quando se clica em Pesquisar (por filtros e por código FIPE)
+ENDPOINT_RESULTADO = "ConsultarValorComTodosParametros"
+
+
+# Lê a tabela de resultado inteira (inclusive as linhas "noborder" de continuação) em um único evaluate
+JS_TABELA_RESULTADO = """
+(id) => {
+    const tabela = document.getElementById(id);
+    if (!tabela) return null;
+    const texto = (td) => {
+        const el = td.querySelector('p, strong');
+        return ((el ? el.innerText : td.innerText) || '').trim();
+    };
+    const dados = {};
+    let ultimaLabel = null;
+    for (const tr of tabela.querySelectorAll('tr')) {
+        const tds = tr.querySelectorAll('td');
+        if (tds.length === 2) {
+            const nome = texto(tds[0]);
+            dados[nome] = texto(tds[1]);
+            ultimaLabel = nome;
+        } else if (tds.length === 1 && ultimaLabel && tds[0].classList.contains('noborder')) {
+            dados[ultimaLabel] = texto(tds[0]);
+        }
+    }
+    return dados;
+}
+"""
+
+
+# Ignora valores vazios e placeholders de template ("{{...}}") que o site deixa na tabela
+def _valor_valido(dados_tabela, *labels):
+    for label in labels:
+        valor = (dados_tabela.get(label) or "").strip()
+        if valor and not valor.startswith('{'):
+            return valor
+    return ""
+
+
+# Monta o dicionário "dados" a partir da tabela de resultado.
+# tabela_id é o id da tabela do tipo de veículo, ex.: "resultadoConsultacarroFiltros"
+async def extrair_tabela_resultado(page, tabela_id):
+    dados_tabela = await page.evaluate(JS_TABELA_RESULTADO, tabela_id)
+    if dados_tabela is None:
+        raise RuntimeError(f"Tabela de resultado '{tabela_id}' não encontrada na página")
+
+    # Labels sem os dois pontos ("Código Fipe:" vira "Código Fipe"): as mesmas colunas que montar_dados
+    # produz a partir do XHR, então o registro tem o mesmo formato venha do JSON ou do DOM
+    por_label = {k.rstrip(':').strip(): v for k, v in dados_tabela.items()}
+    preco_medio = _valor_valido(por_label, "Preço Médio")
+
+    return {
+        "MarcaSelecionada": _valor_valido(por_label, "Marca"),
+        "ModeloSelecionado": _valor_valido(por_label, "Modelo"),
+        "AnoSelecionado": _valor_valido(por_label, "Ano Modelo"),
+        "CodigoFipe": _valor_valido(por_label, "Código Fipe"),
+        "PrecoMedio": preco_medio.replace('R$', '').replace('.', '').replace(',', '.').strip(),
+        "Mes Referencia": _valor_valido(por_label, "Mês de referência"),
+        **por_label
+    }
+
+
+# "1992 Gasolina" e "1992  gasolina" são o mesmo ano; o zero km aparece como "32000" ou "Zero KM"
+def _mesmo_ano(lido, esperado):
+    return normalizar_ano(lido) == normalizar_ano(esperado)
+
+
+# Clica em Pesquisar e monta o registro a partir do JSON que o site busca (XHR).
+# Se a resposta não vier ou vier com erro, cai para a leitura da tabela no DOM, a menos que dom=False:
+# com a seleção reaproveitada a tabela visível ainda é a da pesquisa anterior, então levanta
+# ResultadoDesatualizado e a nova tentativa refaz o formulário. ano_esperado confere o "Ano Modelo" lido do DOM.
+# Latência, timeouts, HTTP 429/5xx e resultados vazios alimentam o controle de concorrência (AIMD)
+async def pesquisar_e_capturar(page, seletor_botao, seletor_resultado, tabela_id, interceptar=True, timeout=50000,
+                               dom=True, ano_esperado=None):
+    botao_pesquisar = page.locator(seletor_botao)
+    await botao_pesquisar.scroll_into_view_if_needed()
+    await adquirir("pesquisa")
+    inicio = time.perf_counter()
+
+    if interceptar:
+        try:
+            async with page.expect_response(lambda r: ENDPOINT_RESULTADO in r.url and r.request.method == "POST", timeout=timeout) as info:
+                await botao_pesquisar.click(force=True)
+            resposta = await info.value
+            controle_concorrencia.registrar_status(resposta.status)
+            corpo = await resposta.json()
+            if isinstance(corpo, dict) and corpo.get("Valor") and not corpo.get("erro"):
+                controle_concorrencia.registrar_sucesso(time.perf_counter() - inicio)
+                return montar_dados(corpo)
+            controle_concorrencia.registrar_falha("resultado vazio")
+            logging.warning(f"[XHR] Resposta sem valor ({corpo}). Lendo a tabela do DOM...")
+        except PlaywrightTimeoutError as e:
+            controle_concorrencia.registrar_falha("timeout")
+            logging.warning(f"[XHR] Resposta não chegou a tempo: {e}. Lendo a tabela do DOM...")
+        except Exception as e:
+            logging.warning(f"[XHR] Não foi possível capturar a resposta: {e}. Lendo a tabela do DOM...")
+        if not dom:
+            raise ResultadoDesatualizado("XHR da pesquisa não capturado e a tabela do DOM pode ser da pesquisa anterior")
+    else:
+        await botao_pesquisar.click(force=True)
+
+    try:
+        await page.wait_for_selector(seletor_resultado, state='visible', timeout=timeout)
+    except PlaywrightTimeoutError:
+        controle_concorrencia.registrar_falha("timeout")
+        raise
+    dados = await extrair_tabela_resultado(page, tabela_id)
+    if ano_esperado is not None and not _mesmo_ano(dados["AnoSelecionado"], ano_esperado):
+        raise ResultadoDesatualizado(f"Tabela mostra o ano '{dados['AnoSelecionado']}', esperado '{ano_esperado}'")
+    if not interceptar:
+        controle_concorrencia.registrar_sucesso(time.perf_counter() - inicio)
+    return dados
+
+
+# Consulta o preço direto no endpoint, sem preencher o formulário, para uma combinação já conhecida
+# (códigos de mês, marca, modelo e ano lidos dos <select> numa execução anterior). Usa o contexto de
+# requisições da própria página (mesmos cookies do navegador) e passa pelo mesmo limitador e controle AIMD.
+# Combinação que o site não reconhece mais levanta ErroSelecao: o chamador volta a descobrir pelo formulário
+async def consultar_valor_direto(page, tipo, codigo_tabela, codigo_marca, codigo_modelo, valor_ano, timeout=20000):
+    await adquirir("pesquisa")
+    inicio = time.perf_counter()
+    try:
+        resposta = await page.request.post(
+            f"{URL_BASE}/{ENDPOINT_RESULTADO}",
+            form=parametros_valor(tipo, codigo_tabela, codigo_marca, codigo_modelo, valor_ano),
+            headers=HEADERS,
+            timeout=timeout,
+        )
+    except PlaywrightTimeoutError:
+        controle_concorrencia.registrar_falha("timeout")
+        raise
+    controle_concorrencia.registrar_status(resposta.status)
+    if not resposta.ok:
+        raise RuntimeError(f"{ENDPOINT_RESULTADO} respondeu HTTP {resposta.status}")
+    corpo = await resposta.json()
+    if not isinstance(corpo, dict) or corpo.get("erro") or not corpo.get("Valor"):
+        raise ErroSelecao(f"Combinação {codigo_marca}/{codigo_modelo}/{valor_ano} sem preço no mês {codigo_tabela}: {corpo}")
+    controle_concorrencia.registrar_sucesso(time.perf_counter() - inicio)
+    return montar_dados(corpo)
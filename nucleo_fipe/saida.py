@@ -0,0 +1,458 @@
+import os
+import csv
+import glob
+import json
+import hashlib
+import time
+import uuid
+import logging
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Registros coletados vão para segmentos só de acréscimo numa pasta por tipo (registros_carros/, ...),
+# em vez de ler, concatenar e regravar o Excel a cada ano. Cada processo grava seus próprios segmentos
+# (part-<pid>-<n>), então dois scrapers do mesmo tipo não disputam arquivo. O Excel sai uma vez no fim.
+FORMATO_PADRAO = "jsonl"
+
+# Registros em memória até a próxima descarga, e segmento novo depois de tantos registros
+REGISTROS_POR_DESCARGA = 100
+SEGUNDOS_POR_DESCARGA = 10.0
+REGISTROS_POR_SEGMENTO = 50000
+
+
+# Chave natural de um registro: o mesmo veículo, ano-modelo e mês de referência é um só registro
+CAMPOS_CHAVE = ("CodigoFipe", "AnoSelecionado", "Mes Referencia")
+
+
+# Rótulo do ano-modelo comparável entre os caminhos de coleta: a API grava "Zero KM Gasolina" para o
+# ano 32000 e a tabela do site pode mostrar "32000 Gasolina"; caixa e espaços também não contam
+def normalizar_ano(texto):
+    texto = " ".join(str(texto or "").lower().split())
+    return "zero km" + texto[len("32000"):] if texto.startswith("32000") else texto
+
+
+def _assinatura(dados):
+    return hashlib.md5(json.dumps(dados, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+# Valores de CAMPOS_CHAVE de um registro, com o ano normalizado
+def _valores_chave(dados):
+    codigo, ano, mes = (str(dados.get(c) or "").strip() for c in CAMPOS_CHAVE)
+    return (codigo, normalizar_ano(ano), mes)
+
+
+# Trava exclusiva de um arquivo de índice; com esperar=False devolve False se outro processo a segura.
+# No Windows a trava de bytes também bloqueia leitura, então trava um byte bem além do fim do arquivo
+BYTE_TRAVA = 1 << 40
+
+
+def _travar(f, esperar=True):
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(BYTE_TRAVA)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if esperar else msvcrt.LK_NBLCK, 1)
+    except OSError:
+        if esperar:
+            raise
+        return False
+    return True
+
+
+# Índice em memória chave natural -> (assinatura, segmento, posição, momento) da versão vigente de cada registro.
+# Gravar a mesma chave de novo é um upsert: conteúdo igual é ignorado, conteúdo diferente vai para o segmento
+# e passa a ser a versão vigente (a antiga fica no disco, mas fora do índice). A consolidação lê só as
+# posições vigentes, sem drop_duplicates sobre a tabela inteira.
+# Persistido na pasta dos segmentos como indice-<pid>-*.jsonl (um por processo, só de acréscimo, travado
+# enquanto o processo escreve); ao carregar, vale a entrada mais recente de cada chave entre todos os arquivos
+class IndiceRegistros:
+    def __init__(self, pasta, tipo=None):
+        self.pasta = pasta
+        self.tipo = tipo
+        self.entradas = {}
+        self.pendentes = {}
+        self.arquivo = None
+        self.substituidos = 0
+
+    def chave(self, dados):
+        valores = _valores_chave(dados)
+        if not all(valores):
+            # Registro sem chave completa não se confunde com nenhum outro: a chave é o próprio conteúdo
+            return (self.tipo, _assinatura(dados))
+        return (self.tipo,) + valores
+
+    # Soma as entradas de um arquivo de índice a "entradas" (a mais recente de cada chave vence)
+    @staticmethod
+    def _ler_arquivo(f, entradas):
+        f.seek(0)
+        for linha in f:
+            try:
+                e = json.loads(linha)
+            except ValueError:
+                continue
+            chave = tuple(e["k"])
+            if len(chave) == 1 + len(CAMPOS_CHAVE):
+                # Índices gravados antes da normalização do ano
+                chave = (chave[0],) + _valores_chave(dict(zip(CAMPOS_CHAVE, chave[1:])))
+            atual = entradas.get(chave)
+            if atual is None or e["t"] >= atual[3]:
+                entradas[chave] = (e["h"], e["s"], e["p"], e["t"])
+
+    # escrever=False (leitura para exportar): não compacta nem grava o índice reconstruído, só monta em memória.
+    # Com escrever=True, os arquivos de processos que já terminaram (os que se deixam travar) viram um só
+    # arquivo compactado, para a carga seguinte não repetir o histórico inteiro de upserts
+    @classmethod
+    def carregar(cls, pasta, tipo=None, escrever=True):
+        indice = cls(pasta, tipo)
+        arquivos = sorted(glob.glob(os.path.join(pasta, "indice-*.jsonl")))
+        mortos, entradas_mortas = [], {}
+        try:
+            for caminho in arquivos:
+                try:
+                    f = open(caminho, "r", encoding="utf-8")
+                except OSError:
+                    continue
+                if escrever and _travar(f, esperar=False):
+                    # Fica aberto e travado até a compactação terminar
+                    mortos.append((caminho, f))
+                    cls._ler_arquivo(f, entradas_mortas)
+                else:
+                    with f:
+                        cls._ler_arquivo(f, indice.entradas)
+            if len(mortos) > 1:
+                indice._compactar(entradas_mortas)
+                # No POSIX remove ainda travado: um processo que acabou de criar o arquivo e espera a trava
+                # vê que ele sumiu e abre outro. O Windows não remove arquivo aberto: fecha antes
+                while mortos:
+                    caminho, f = mortos.pop()
+                    if not fcntl:
+                        f.close()
+                    try:
+                        os.remove(caminho)
+                    except OSError as e:
+                        logging.warning(f"[ÍNDICE] {caminho} já compactado, mas não foi removido: {e}")
+                    f.close()
+        finally:
+            for _, f in mortos:
+                f.close()
+        for chave, entrada in entradas_mortas.items():
+            atual = indice.entradas.get(chave)
+            if atual is None or entrada[3] >= atual[3]:
+                indice.entradas[chave] = entrada
+        if not arquivos and glob.glob(os.path.join(pasta, "part-*")):
+            indice.reconstruir(persistir=escrever)
+        return indice
+
+    # Uma linha por chave num arquivo novo (temporário + rename): se cair no meio, os antigos continuam lá
+    def _compactar(self, entradas):
+        caminho = os.path.join(self.pasta, f"indice-{os.getpid()}-{time.time_ns()}-compacto.jsonl")
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            for chave, (assinatura, segmento, posicao, momento) in entradas.items():
+                f.write(json.dumps({"k": chave, "h": assinatura, "s": segmento, "p": posicao, "t": momento}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(caminho + ".tmp", caminho)
+        logging.info(f"[ÍNDICE] Arquivos de índice de execuções anteriores compactados em {len(entradas)} chaves ({self.pasta})")
+
+    # Pasta com segmentos anteriores ao índice: indexa tudo uma vez, o último registro de cada chave vence.
+    # persistir=False só monta em memória (quem está apenas lendo não escreve na pasta)
+    def reconstruir(self, persistir=True):
+        registros, posicoes = [], []
+        for caminho in sorted(glob.glob(os.path.join(self.pasta, "part-*"))):
+            df = _ler_segmento(caminho)
+            if df is None:
+                continue
+            nome = os.path.basename(caminho)
+            for posicao, dados in enumerate(df.to_dict("records")):
+                registros.append({k: v for k, v in dados.items() if not pd.isna(v)})
+                posicoes.append((nome, posicao))
+        if registros:
+            self.registrar(registros, posicoes, persistir=persistir)
+            logging.info(f"[ÍNDICE] {len(self.entradas)} chaves indexadas a partir de {len(registros)} registros em {self.pasta}")
+
+    # True se o registro deve ser escrito (chave nova ou conteúdo mudou); guarda a assinatura até a descarga
+    def aceitar(self, dados):
+        chave = self.chave(dados)
+        assinatura = _assinatura(dados)
+        atual = self.pendentes.get(chave) or (self.entradas[chave][0] if chave in self.entradas else None)
+        if atual == assinatura:
+            return False
+        if atual is not None:
+            self.substituidos += 1
+        self.pendentes[chave] = assinatura
+        return True
+
+    # Arquivo de índice deste processo, travado enquanto estiver aberto. Se outro processo o compactou e
+    # removeu entre a criação e a trava (parecia de um processo morto), abre outro
+    def _abrir_arquivo(self):
+        while True:
+            caminho = os.path.join(self.pasta, f"indice-{os.getpid()}-{time.time_ns()}.jsonl")
+            arquivo = open(caminho, "a", encoding="utf-8")
+            _travar(arquivo)
+            if os.path.exists(caminho):
+                return arquivo
+            arquivo.close()
+
+    def registrar(self, registros, posicoes, persistir=True):
+        agora = time.time()
+        linhas = []
+        for dados, (segmento, posicao) in zip(registros, posicoes):
+            chave = self.chave(dados)
+            assinatura = _assinatura(dados)
+            self.entradas[chave] = (assinatura, segmento, posicao, agora)
+            if self.pendentes.get(chave) == assinatura:
+                del self.pendentes[chave]
+            linhas.append(json.dumps({"k": chave, "h": assinatura, "s": segmento, "p": posicao, "t": agora}, ensure_ascii=False))
+        if not persistir:
+            return
+        if self.arquivo is None:
+            self.arquivo = self._abrir_arquivo()
+        self.arquivo.write("\n".join(linhas) + "\n")
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+
+    # Posições vigentes agrupadas por segmento
+    def vigentes(self):
+        por_segmento = {}
+        for _, segmento, posicao, _ in self.entradas.values():
+            por_segmento.setdefault(segmento, []).append(posicao)
+        return {segmento: sorted(posicoes) for segmento, posicoes in por_segmento.items()}
+
+    def fechar(self):
+        if self.arquivo:
+            self.arquivo.close()
+            self.arquivo = None
+        if self.substituidos:
+            logging.info(f"[ÍNDICE] {self.substituidos} registros substituídos por versão nova em {self.pasta}")
+
+
+class SaidaRegistros:
+    extensao = ""
+
+    def __init__(self, pasta, tipo=None, lote=REGISTROS_POR_DESCARGA, intervalo=SEGUNDOS_POR_DESCARGA,
+                 por_segmento=REGISTROS_POR_SEGMENTO, indexar=True):
+        self.pasta = pasta
+        self.lote = lote
+        self.intervalo = intervalo
+        self.por_segmento = por_segmento
+        self.buffer = []
+        self.segmento = 0
+        self.caminho = None
+        self.linhas = 0
+        self.gravados = 0
+        self.repetidos = 0
+        self.ultima_descarga = time.monotonic()
+        os.makedirs(pasta, exist_ok=True)
+        self.indice = IndiceRegistros.carregar(pasta, tipo) if indexar else None
+
+    # Nome único mesmo com duas saídas do mesmo processo na mesma pasta (o índice guarda posições por
+    # segmento, então dois escritores no mesmo arquivo corromperiam as posições); os formatos abrem com "x"
+    def _abrir_segmento(self):
+        nome = f"part-{os.getpid()}-{time.time_ns()}-{uuid.uuid4().hex[:8]}-{self.segmento:04d}{self.extensao}"
+        self.caminho = os.path.join(self.pasta, nome)
+        self.linhas = 0
+        return self.caminho
+
+    # (segmento, posição) das próximas n linhas do segmento aberto
+    def _posicoes(self, n):
+        nome = os.path.basename(self.caminho)
+        posicoes = [(nome, self.linhas + i) for i in range(n)]
+        self.linhas += n
+        return posicoes
+
+    # Custo constante por registro: só acrescenta ao buffer; a descarga escreve apenas o que é novo.
+    # Registro idêntico ao que o índice já tem para a mesma chave (nova coleta do mesmo ano) nem é escrito
+    def gravar(self, dados):
+        if self.indice is not None and not self.indice.aceitar(dados):
+            self.repetidos += 1
+            return
+        self.buffer.append(dados)
+        if len(self.buffer) >= self.lote or time.monotonic() - self.ultima_descarga >= self.intervalo:
+            self.descarregar()
+
+    def descarregar(self):
+        if self.buffer:
+            if self.caminho is not None and self.linhas >= self.por_segmento:
+                self._novo_segmento()
+            posicoes = self._escrever(self.buffer)
+            # Índice só depois dos dados em disco: posição indexada sempre existe no segmento
+            if self.indice is not None:
+                self.indice.registrar(self.buffer, posicoes)
+            self.gravados += len(self.buffer)
+            self.buffer = []
+        self.ultima_descarga = time.monotonic()
+
+    def _novo_segmento(self):
+        self._fechar_segmento()
+        self.segmento += 1
+
+    # Escreve os registros e devolve (segmento, posição) de cada um
+    def _escrever(self, registros):
+        raise NotImplementedError
+
+    def _fechar_segmento(self):
+        self.caminho = None
+
+    def fechar(self):
+        self.descarregar()
+        self._fechar_segmento()
+        if self.indice is not None:
+            self.indice.fechar()
+        logging.info(f"[SAÍDA] {self.gravados} registros gravados em {self.pasta}, {self.repetidos} repetidos ignorados")
+
+
+# Uma linha JSON por registro; o formato mais tolerante (colunas podem variar entre registros)
+class SaidaJsonl(SaidaRegistros):
+    extensao = ".jsonl"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arquivo = None
+
+    def _escrever(self, registros):
+        if self.arquivo is None:
+            self.arquivo = open(self._abrir_segmento(), "x", encoding="utf-8")
+        self.arquivo.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in registros))
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+        return self._posicoes(len(registros))
+
+    def _fechar_segmento(self):
+        if self.arquivo:
+            self.arquivo.close()
+            self.arquivo = None
+        super()._fechar_segmento()
+
+
+# CSV com o cabeçalho do primeiro registro do segmento; registro com colunas novas abre outro segmento
+class SaidaCsv(SaidaRegistros):
+    extensao = ".csv"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arquivo = None
+        self.escritor = None
+        self.colunas = None
+
+    def _escrever(self, registros):
+        posicoes = []
+        for r in registros:
+            if self.colunas is not None and not set(r) <= set(self.colunas):
+                self._novo_segmento()
+            if self.arquivo is None:
+                self.colunas = list(r)
+                self.arquivo = open(self._abrir_segmento(), "x", encoding="utf-8", newline="")
+                self.escritor = csv.DictWriter(self.arquivo, fieldnames=self.colunas)
+                self.escritor.writeheader()
+            self.escritor.writerow(r)
+            posicoes += self._posicoes(1)
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+        return posicoes
+
+    def _fechar_segmento(self):
+        if self.arquivo:
+            self.arquivo.close()
+        self.arquivo = self.escritor = self.colunas = None
+        super()._fechar_segmento()
+
+
+# Parquet (pyarrow): cada descarga vira um arquivo completo e fechado, tudo como texto para o esquema não variar.
+# Um Parquet só fica legível com o rodapé escrito, então não há segmento aberto entre descargas: o que a
+# descarga devolveu (e o índice e o banco de estado já contam como gravado) está num arquivo íntegro.
+# Escreve num temporário e renomeia, para uma queda no meio não deixar arquivo cortado com nome de segmento
+class SaidaParquet(SaidaRegistros):
+    extensao = ".parquet"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        import pyarrow  # noqa: F401 — falha cedo se a dependência opcional não estiver instalada
+
+    def _escrever(self, registros):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        colunas = list(dict.fromkeys(k for r in registros for k in r))
+        tabela = pa.table({c: [None if r.get(c) is None else str(r.get(c)) for r in registros] for c in colunas},
+                          schema=pa.schema([(c, pa.string()) for c in colunas]))
+        caminho = self._abrir_segmento()
+        with open(caminho + ".tmp", "xb") as f:
+            pq.write_table(tabela, f)
+        os.replace(caminho + ".tmp", caminho)
+        posicoes = self._posicoes(len(registros))
+        self._novo_segmento()
+        return posicoes
+
+
+FORMATOS = {
+    "jsonl": SaidaJsonl,
+    "csv": SaidaCsv,
+    "parquet": SaidaParquet,
+}
+
+
+def criar_saida(pasta, formato=FORMATO_PADRAO, **kwargs):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de saída inválido: {formato} (use {', '.join(FORMATOS)})")
+    return FORMATOS[formato](pasta, **kwargs)
+
+
+# Linha cortada no fim de um segmento (queda no meio da descarga) é ignorada, não o segmento inteiro
+def _ler_jsonl(caminho):
+    registros = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                continue
+    return pd.DataFrame(registros)
+
+
+def _ler_segmento(caminho):
+    try:
+        if caminho.endswith(".jsonl"):
+            return _ler_jsonl(caminho)
+        if caminho.endswith(".csv"):
+            return pd.read_csv(caminho, dtype=str, keep_default_na=False)
+        if caminho.endswith(".parquet"):
+            return pd.read_parquet(caminho)
+    except Exception as e:
+        logging.warning(f"[SAÍDA] Erro ao ler {caminho}: {e}")
+    return None
+
+
+def _chaves(df):
+    if not all(c in df.columns for c in CAMPOS_CHAVE):
+        return None
+    return df[list(CAMPOS_CHAVE)].fillna("").astype(str).apply(lambda linha: "|".join(_valores_chave(linha)), axis=1)
+
+
+# Versão vigente de cada registro da pasta, lida pelas posições do índice (qualquer formato e processo).
+# legado: DataFrames de antes dos segmentos (Excel temporário); entram só as chaves que os segmentos não têm
+def ler_registros(pasta, tipo=None, legado=()):
+    dfs = []
+    if os.path.isdir(pasta):
+        for segmento, posicoes in IndiceRegistros.carregar(pasta, tipo, escrever=False).vigentes().items():
+            df = _ler_segmento(os.path.join(pasta, segmento))
+            if df is None:
+                continue
+            dfs.append(df.iloc[[p for p in posicoes if p < len(df)]])
+    atual = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+    chaves_atuais = _chaves(atual) if not atual.empty else None
+    for df in legado:
+        if df is None or df.empty:
+            continue
+        chaves = _chaves(df)
+        if chaves is not None and chaves_atuais is not None:
+            df = df[~chaves.isin(set(chaves_atuais))]
+        dfs.append(df)
+    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
@@ -0,0 +1,158 @@
+import logging
+
+# Seleciona direto no <select> escondido atrás do chosen e dispara os eventos que o site escuta.
+# O índice segue a ordem dos <li> do chosen, sem os títulos de grupo (data-option-array-index aponta para select.options).
+JS_SELECIONAR_OPCAO = """
+({selectId, containerId, indice, valor, texto}) => {
+    const select = document.getElementById(selectId);
+    if (!select) return {ok: false, erro: `select #${selectId} não encontrado`};
+
+    let opcao = null;
+    if (valor !== null && valor !== undefined) {
+        opcao = Array.from(select.options).find(o => o.value === String(valor));
+    } else if (texto !== null && texto !== undefined) {
+        const alvo = texto.trim().toLowerCase();
+        opcao = Array.from(select.options).find(o => o.text.trim().toLowerCase() === alvo);
+    } else if (indice !== null && indice !== undefined) {
+        const lis = document.querySelectorAll(`#${containerId} ul.chosen-results > li:not(.group-result)`);
+        const li = lis[indice];
+        if (li && li.dataset.optionArrayIndex !== undefined) {
+            opcao = select.options[Number(li.dataset.optionArrayIndex)];
+        } else {
+            const visiveis = Array.from(select.options).filter(o => o.text.trim() !== '');
+            opcao = visiveis[indice];
+        }
+    }
+    if (!opcao) return {ok: false, erro: 'opção não encontrada', total: select.options.length};
+
+    if (window.jQuery) {
+        const $select = window.jQuery(select);
+        $select.val(opcao.value).trigger('change');
+        $select.trigger('chosen:updated').trigger('liszt:updated').trigger('chosen:close');
+    } else {
+        select.value = opcao.value;
+        select.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    return {ok: true, valor: opcao.value, texto: opcao.text.trim()};
+}
+"""
+
+# Assinatura das opções do dropdown dependente, para saber quando o AJAX trocou a lista
+JS_ASSINATURA_OPCOES = """
+(selectId) => {
+    const select = document.getElementById(selectId);
+    if (!select) return '';
+    return Array.from(select.options).map(o => o.value).join('|');
+}
+"""
+
+JS_DEPENDENTE_CARREGADO = """
+([selectId, assinaturaAnterior]) => {
+    const select = document.getElementById(selectId);
+    if (!select) return false;
+    const valores = Array.from(select.options).map(o => o.value);
+    if (!valores.some(v => v !== '')) return false;
+    // Com jQuery o AJAX já foi disparado dentro do trigger('change'): basta esperar ele terminar
+    if (window.jQuery) return window.jQuery.active === 0;
+    return valores.join('|') !== assinaturaAnterior;
+}
+"""
+
+
+# Texto e value de cada opção do <select> (sem o placeholder vazio): os values são os códigos que o site manda ao endpoint
+JS_OPCOES_COM_VALOR = """
+(selectId) => {
+    const select = document.getElementById(selectId);
+    if (!select) return [];
+    return Array.from(select.options)
+        .filter(o => o.value !== '' && o.text.trim() !== '')
+        .map(o => [o.text.trim(), o.value]);
+}
+"""
+
+
+class ErroSelecao(Exception):
+    pass
+
+
+# A tabela visível não é a da pesquisa que acabou de ser feita (ex.: ficou a do ano anterior)
+class ResultadoDesatualizado(Exception):
+    pass
+
+
+# "selectMarcacarro_chosen" -> "selectMarcacarro"
+def select_do_container(container_id):
+    return container_id[:-len("_chosen")] if container_id.endswith("_chosen") else container_id
+
+
+# Seleção em tempo constante: não depende da posição do item na lista.
+# Se "dependente" for informado (id do <select> que o site recarrega), espera ele popular.
+async def selecionar_opcao_js(page, container_id, indice=None, valor=None, texto=None, dependente=None, timeout=30000):
+    select_id = select_do_container(container_id)
+
+    assinatura = None
+    if dependente:
+        assinatura = await page.evaluate(JS_ASSINATURA_OPCOES, dependente)
+
+    resultado = await page.evaluate(JS_SELECIONAR_OPCAO, {
+        "selectId": select_id,
+        "containerId": container_id,
+        "indice": indice,
+        "valor": valor,
+        "texto": texto,
+    })
+    if not resultado.get("ok"):
+        raise ErroSelecao(f"Falha ao selecionar no dropdown {container_id}: {resultado.get('erro')}")
+
+    logging.info(f"Selecionado '{resultado['texto']}' no dropdown {container_id} (via JS)")
+
+    if dependente:
+        try:
+            await page.wait_for_function(JS_DEPENDENTE_CARREGADO, arg=[dependente, assinatura], timeout=timeout)
+        except Exception as e:
+            logging.warning(f"[SELEÇÃO] Dropdown dependente {dependente} não mudou após selecionar em {container_id}: {e}")
+
+    return resultado
+
+
+# [(texto, value)] das opções do dropdown, lidas direto do <select> sem abrir a lista
+async def opcoes_com_valor(page, container_id):
+    return [tuple(opcao) for opcao in await page.evaluate(JS_OPCOES_COM_VALOR, select_do_container(container_id))]
+
+
+# Texto mostrado no chosen ("" se o dropdown não existe); serve para conferir o estado do formulário sem abrir a lista
+async def texto_selecionado(page, container_id):
+    return await page.evaluate(
+        """(id) => {
+            const span = document.querySelector(`div.chosen-container#${id} a span`);
+            return span ? span.textContent.trim() : '';
+        }""",
+        container_id
+    )
+
+
+# Confere numa só ida ao navegador se cada dropdown ainda mostra o texto esperado ({container_id: texto}).
+# Igualdade exata (sem caixa e espaços extras): por substring "Rover" casaria com "Land Rover"
+async def formulario_confere(page, esperado):
+    return await page.evaluate(
+        """(esperado) => Object.entries(esperado).every(([id, texto]) => {
+            const normalizar = (t) => (t || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+            const span = document.querySelector(`div.chosen-container#${id} a span`);
+            return !!span && normalizar(span.textContent) === normalizar(texto);
+        })""",
+        esperado
+    )
+
+
+# Quantas reseleções de marca/modelo o loop de anos evitou e quantas vezes o formulário tinha mudado (deriva)
+class ContadorReselecao:
+    def __init__(self):
+        self.evitadas = 0
+        self.derivas = 0
+
+    def logar(self):
+        if self.evitadas or self.derivas:
+            logging.info(f"[RESELEÇÃO] {self.evitadas} reseleções de marca/modelo evitadas, {self.derivas} refeitas por deriva do formulário")
+
+
+contador_reselecao = ContadorReselecao()
@@ -0,0 +1,146 @@
+import time
+import random
+import asyncio
+import logging
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, Error as PlaywrightError
+
+from nucleo_fipe.selecao import ErroSelecao, ResultadoDesatualizado
+
+# Classes de erro que valem nova tentativa: o site demorou, o elemento foi recriado pelo AJAX,
+# a página caiu/navegou ou a tabela lida era de outra pesquisa. Erro de seleção (opção inexistente)
+# e "outro" sobem direto.
+REPETIVEIS = {"timeout", "elemento_obsoleto", "navegacao", "desatualizado"}
+
+# Só estas classes indicam site degradado e contam para abrir o disjuntor
+DEGRADACAO = {"timeout", "navegacao"}
+
+
+def classificar_erro(e):
+    if isinstance(e, (PlaywrightTimeoutError, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(e, ErroSelecao):
+        return "selecao"
+    if isinstance(e, ResultadoDesatualizado):
+        return "desatualizado"
+    mensagem = str(e).lower()
+    if isinstance(e, PlaywrightError):
+        if "detached" in mensagem or "not attached" in mensagem or "stale" in mensagem:
+            return "elemento_obsoleto"
+        if ("navigation" in mensagem or "target closed" in mensagem or "has been closed" in mensagem
+                or "net::" in mensagem or "context was destroyed" in mensagem):
+            return "navegacao"
+    return "outro"
+
+
+# Disjuntor por etapa (ex.: "pesquisa", "navegacao"): depois de "limiar" falhas seguidas de degradação,
+# todos os workers param aquela etapa por "pausa" segundos em vez de cada um gastar seus timeouts.
+# Passada a pausa, um único worker testa (meio-aberto): sucesso fecha, falha reabre com pausa dobrada
+class DisjuntorCircuito:
+    def __init__(self, limiar=5, pausa=60.0, pausa_max=600.0):
+        self.limiar = limiar
+        self.pausa = pausa
+        self.pausa_max = pausa_max
+        self.etapas = {}
+        self.aberturas = 0
+        self.tempo_pausado = 0.0
+
+    def _estado(self, etapa):
+        return self.etapas.setdefault(etapa, {"falhas": 0, "aberto_ate": 0.0, "pausa": self.pausa, "sonda": False})
+
+    # Espera a etapa liberar; no meio-aberto só um worker passa, como sonda
+    async def aguardar(self, etapa):
+        estado = self._estado(etapa)
+        inicio = time.monotonic()
+        while True:
+            agora = time.monotonic()
+            if estado["aberto_ate"] > agora:
+                await asyncio.sleep(estado["aberto_ate"] - agora)
+                continue
+            if estado["falhas"] < self.limiar:
+                break
+            if not estado["sonda"]:
+                estado["sonda"] = True
+                logging.info(f"[DISJUNTOR] {etapa}: testando o site com uma única requisição")
+                break
+            await asyncio.sleep(1)
+        self.tempo_pausado += time.monotonic() - inicio
+
+    def registrar_sucesso(self, etapa):
+        estado = self._estado(etapa)
+        if estado["falhas"] >= self.limiar:
+            logging.info(f"[DISJUNTOR] {etapa}: site respondeu, disjuntor fechado")
+        estado.update(falhas=0, pausa=self.pausa, sonda=False)
+
+    def registrar_falha(self, etapa, classe):
+        estado = self._estado(etapa)
+        if classe not in DEGRADACAO:
+            # Sonda que falhou por outro motivo não diz nada do site: libera outra sonda
+            estado["sonda"] = False
+            return
+        estado["falhas"] += 1
+        if estado["sonda"] or estado["falhas"] == self.limiar:
+            if estado["sonda"]:
+                estado["pausa"] = min(self.pausa_max, estado["pausa"] * 2)
+            estado["sonda"] = False
+            estado["aberto_ate"] = time.monotonic() + estado["pausa"]
+            self.aberturas += 1
+            logging.warning(f"[DISJUNTOR] {etapa}: {estado['falhas']} falhas seguidas ({classe}), "
+                            f"pausando todos os workers por {estado['pausa']:.0f}s")
+
+
+disjuntor = DisjuntorCircuito()
+
+
+# Tentativas limitadas por etapa com recuo exponencial e jitter ("full jitter": espera sorteada entre 0
+# e base * 2^n, limitada a teto). recuperar(classe) roda antes de cada nova tentativa, ex.: recarregar a página
+class PoliticaRetentativa:
+    def __init__(self, max_tentativas=3, base=1.0, teto=30.0, disjuntor_etapas=None):
+        self.max_tentativas = max_tentativas
+        self.base = base
+        self.teto = teto
+        self.disjuntor = disjuntor_etapas or disjuntor
+        self.erros = {}
+        self.retentativas = 0
+        self.desistencias = 0
+
+    def _recuo(self, tentativa):
+        return random.uniform(0, min(self.teto, self.base * 2 ** (tentativa - 1)))
+
+    async def executar(self, etapa, funcao, *args, recuperar=None, **kwargs):
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self.disjuntor.aguardar(etapa)
+            try:
+                resultado = await funcao(*args, **kwargs)
+            except Exception as e:
+                classe = classificar_erro(e)
+                self.erros[classe] = self.erros.get(classe, 0) + 1
+                self.disjuntor.registrar_falha(etapa, classe)
+                if classe not in REPETIVEIS or tentativa == self.max_tentativas:
+                    self.desistencias += 1
+                    raise
+                espera = self._recuo(tentativa)
+                self.retentativas += 1
+                logging.warning(f"[RETENTATIVA] {etapa} {tentativa}/{self.max_tentativas} ({classe}): {e}. "
+                                f"Nova tentativa em {espera:.1f}s")
+                await asyncio.sleep(espera)
+                if recuperar:
+                    try:
+                        await recuperar(classe)
+                    except Exception as erro_recuperar:
+                        logging.warning(f"[RETENTATIVA] Recuperação de {etapa} falhou: {erro_recuperar}")
+                continue
+            self.disjuntor.registrar_sucesso(etapa)
+            return resultado
+
+    def logar(self):
+        if not self.erros:
+            return
+        por_classe = ", ".join(f"{classe}: {n}" for classe, n in sorted(self.erros.items()))
+        logging.info(
+            f"[RETENTATIVA] {self.retentativas} retentativas, {self.desistencias} desistências ({por_classe}); "
+            f"disjuntor abriu {self.disjuntor.aberturas}x, {self.disjuntor.tempo_pausado:.0f}s de espera somada"
+        )
+
+
+politica_padrao = PoliticaRetentativa()
@@ -10,6 +10,9 @@ import json
 from asyncio import Queue
 import random
 
+from nucleo_fipe.esperas import esperar_opcoes_carregadas, esperar_formulario_resetado, pausa_cortesia, relatorio_esperas
+from nucleo_fipe.contexto import criar_contexto, navegar, metricas_rede
+
 # Configura encoding e logging
 sys.stdout.reconfigure(encoding='utf-8')
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -95,22 +98,22 @@ def salvar_modelos_processados(modelos_processados):
     with open("modelos_processados_motos.json", "w", encoding="utf-8") as f:
         json.dump(modelos_processados, f, ensure_ascii=False, indent=2)
 
+# As pausas fixas viraram pausas de cortesia configuráveis (nucleo_fipe.esperas.configurar_cortesia);
+# sleep_antigo é a média do sleep que existia antes, para o relatório de tempo economizado
 async def pausa_curta():
-    await asyncio.sleep(random.uniform(0.8, 1.6))
+    await pausa_cortesia("pausa_curta", sleep_antigo=1.2)
 
 async def pausa_lenta():
-    delay = random.uniform(8, 12)  
+    delay = await pausa_cortesia("pausa_lenta", sleep_antigo=10, lenta=True)
     logging.info(f"Pausa anti-bloqueio: {delay:.1f}s")
-    await asyncio.sleep(delay)
         
 # Abre o dropdown/Seleção de itens e deixa aberto um tempo para carregar
 async def abrir_dropdown_e_esperar(page, container_id):
     logging.info(f"Abrindo dropdown: {container_id}")
     # Clica no elemento <a class="chosen-single">
     await page.click(f'div.chosen-container#{container_id} a.chosen-single', force=True)
-    await asyncio.sleep(0.5)
     # Espera lista aparecer
-    await page.wait_for_selector(f'div.chosen-container#{container_id} .chosen-drop ul.chosen-results > li', state='visible', timeout=5000)
+    await esperar_opcoes_carregadas(page, container_id, sleep_antigo=0.5, timeout=5000, ponto="abrir_dropdown")
     
 def dividir_em_lotes(marcas_lista, max_workers):
     tamanho_lote = (len(marcas_lista) + max_workers - 1) // max_workers
@@ -281,16 +284,9 @@ async def limpar_pesquisa(page, nome_marca=None):
         await limpar_link.scroll_into_view_if_needed()
         await limpar_link.click()
         logging.info(">>> Pesquisa limpa com sucesso.")
-        await asyncio.sleep(2)
 
         # Aguarda reset visual
-        await page.wait_for_function(
-            """() => {
-                const span = document.querySelector('#selectMarcamoto_chosen a span');
-                return span && span.textContent.toLowerCase().includes('selecione');
-            }""",
-            timeout=10000
-        )
+        await esperar_formulario_resetado(page, "selectMarcamoto_chosen", sleep_antigo=2, ponto="limpar_pesquisa")
         logging.info(">>> Confirmação visual: dropdown de Marca resetado.")
 
         # Se nome de marca foi passado, re-seleciona
@@ -308,10 +304,10 @@ async def fechar_todos_dropdowns(page):
     
 async def worker(queue, browser, marcas_lista, modelos_processados, marcas_processadas, max_modelos, max_anos):
     # cada worker cria seu contexto isolado
-    context = await browser.new_context()
+    context = await criar_contexto(browser)
     page = await context.new_page()
 
-    await page.goto('https://veiculos.fipe.org.br/', timeout=120000)
+    await navegar(page, timeout=120000)
     await page.wait_for_selector('li:has-text("Motos")', timeout=30000)
     await page.click('li:has-text("Motos")')
 
@@ -579,4 +575,6 @@ if __name__ == "__main__":
     Fipe_df = pd.DataFrame(Fipe)
     print("\n\nDADOS FINAIS COLETADOS")
     print(Fipe_df)
-    Fipe_df.to_excel("Fipe_moto.xlsx", index=False)
\ No newline at end of file
+    relatorio_esperas.logar()
+    metricas_rede.logar()
+    Fipe_df.to_excel("Fipe_moto.xlsx", index=False)